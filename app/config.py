@@ -10,12 +10,36 @@ except ImportError:
 # Google AI Configuration (for Gemini - main AI engine)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+# Open the Gemini HTTPS connection at startup instead of on the first request
+GEMINI_WARMUP = os.getenv("GEMINI_WARMUP", "false")
+
 # Firecrawl Configuration (for URL scraping)
 FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY")
 
+# Create the Firecrawl client at startup instead of on the first scrape
+FIRECRAWL_WARMUP = os.getenv("FIRECRAWL_WARMUP", "false")
+
+# How long (seconds) scraped pages are reused before Firecrawl is called again
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "300"))
+
+# Firecrawl rate limiting: max concurrent API calls, and min seconds between requests to one site.
+# Both count API calls - a batch scrape holds one slot until the whole batch is done and
+# waits once per distinct site in it; Firecrawl paces the pages inside a batch itself.
+FIRECRAWL_MAX_CONCURRENCY = int(os.getenv("FIRECRAWL_MAX_CONCURRENCY", "4"))
+SCRAPE_MIN_INTERVAL = float(os.getenv("SCRAPE_MIN_INTERVAL", "0.2"))
+
+# Max seconds to wait for a website crawl before giving up on it
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "300"))
+
+# Optional Redis cache so scrape/crawl results are shared across worker processes
+REDIS_URL = os.getenv("REDIS_URL")
+
 # ChromaDB Configuration
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
 
+# Business DNA cache (analysis results keyed by image content, shared across processes)
+DNA_CACHE_DIR = os.getenv("DNA_CACHE_DIR", "./.cache/dna")
+
 # LangSmith Configuration (optional, for tracing & monitoring)
 LANGSMITH_TRACING = os.getenv("LANGSMITH_TRACING", "false")
 LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
@@ -1,5 +1,6 @@
 """LangGraph Design Automation Agent with powerful tools."""
 
+from langchain_core.runnables import RunnableLambda
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
@@ -17,6 +18,7 @@ from app.tools.image_generator import (
 )
 from app.tools.style_analyzer import (
     analyze_design_style,
+    analyze_design_style_batch,
     get_style_context,
     list_analyzed_styles,
     compare_styles,
@@ -32,6 +34,7 @@ from app.tools.knowledge_store import (
 )
 from app.tools.url_scraper import (
     scrape_brand_from_url,
+    scrape_brands_batch,
     crawl_website_for_brand,
     extract_brand_identity,
 )
@@ -120,6 +123,7 @@ def create_agent_graph():
         list_generated_images,
         # Style analysis tools
         analyze_design_style,
+        analyze_design_style_batch,
         get_style_context,
         list_analyzed_styles,
         compare_styles,
@@ -134,6 +138,7 @@ def create_agent_graph():
         delete_knowledge_document,
         # URL scraping tools
         scrape_brand_from_url,
+        scrape_brands_batch,
         crawl_website_for_brand,
         extract_brand_identity,
         # Screen management tools (Cursor-like)
@@ -169,26 +174,33 @@ def create_agent_graph():
     )
     
     # Create a wrapper graph that extracts images first
-    def extract_images_node(state: AgentState) -> AgentState:
-        """Node that extracts images from messages and stores in tool state."""
-        extract_images_from_state(state)
-        return state
-    
     def agent_node(state: AgentState) -> AgentState:
-        """Node that runs the react agent."""
+        """Node that extracts images from messages, then runs the react agent.
+        
+        Extraction happens in the same node because uploaded images are stored
+        in a ContextVar, and each graph node runs in its own copy of the context.
+        """
+        extract_images_from_state(state)
         result = react_agent.invoke(state)
         return result
     
+    async def agent_node_async(state: AgentState) -> AgentState:
+        """Async version of agent_node, used when the graph runs on an event loop (LangGraph server).
+        
+        Model calls are awaited and LangChain runs the sync tools (Firecrawl,
+        Gemini, ...) on worker threads, so one slow scrape doesn't stall other runs.
+        """
+        extract_images_from_state(state)
+        return await react_agent.ainvoke(state)
+    
     # Build the graph
     graph = StateGraph(AgentState)
     
     # Add nodes
-    graph.add_node("extract_images", extract_images_node)
-    graph.add_node("agent", agent_node)
+    graph.add_node("agent", RunnableLambda(agent_node, afunc=agent_node_async))
     
     # Add edges
-    graph.add_edge(START, "extract_images")
-    graph.add_edge("extract_images", "agent")
+    graph.add_edge(START, "agent")
     graph.add_edge("agent", END)
     
     # Compile with checkpointer
@@ -3,7 +3,7 @@
 Extracts images from incoming messages and stores them in tool state
 so tools can access them.
 """
-import base64
+import binascii
 from typing import Any
 from langchain_core.messages import HumanMessage
 
@@ -76,7 +76,7 @@ def extract_all_images_from_messages(messages: list) -> list[tuple[bytes, str]]:
                     if data:
                         if isinstance(data, str):
                             try:
-                                images.append((base64.b64decode(data), mime_type))
+                                images.append((_decode_once(data), mime_type))
                                 continue
                             except Exception as e:
                                 print(f"  [WARNING] Failed to decode base64: {e}")
@@ -91,7 +91,7 @@ def extract_all_images_from_messages(messages: list) -> list[tuple[bytes, str]]:
                         media_type = source.get("media_type", "image/jpeg")
                         if data:
                             try:
-                                images.append((base64.b64decode(data), media_type))
+                                images.append((_decode_once(data), media_type))
                             except Exception as e:
                                 print(f"  [WARNING] Failed to decode base64: {e}")
     
@@ -113,24 +113,28 @@ def extract_image_from_messages(messages: list) -> tuple[bytes | None, str | Non
     return None, None
 
 
+def _decode_once(data: str | bytes | memoryview) -> bytes:
+    """Decode base64 image data into raw bytes (the only decode an image goes through)."""
+    return binascii.a2b_base64(data)
+
+
 def _parse_data_url(url: str) -> tuple[bytes | None, str | None]:
     """Parse a data URL and extract the binary data and MIME type."""
     try:
         if not url.startswith("data:"):
             return None, None
         
-        parts = url.split(",", 1)
-        if len(parts) != 2:
+        comma = url.find(",")
+        if comma == -1:
             return None, None
         
-        header = parts[0]  # data:image/jpeg;base64
-        data = parts[1]    # base64 encoded data
+        header = url[:comma]  # data:image/jpeg;base64
         
         # Extract MIME type
         mime_part = header.replace("data:", "").split(";")[0]
         
         # Decode base64
-        image_bytes = base64.b64decode(data)
+        image_bytes = _decode_once(url[comma + 1:])
         
         return image_bytes, mime_part
     except Exception as e:
@@ -8,6 +8,7 @@ from app.tools.image_generator import (
 )
 from app.tools.style_analyzer import (
     analyze_design_style,
+    analyze_design_style_batch,
     get_style_context,
     list_analyzed_styles,
     compare_styles,
@@ -21,6 +22,7 @@ from app.tools.knowledge_store import (
 )
 from app.tools.url_scraper import (
     scrape_brand_from_url,
+    scrape_brands_batch,
     crawl_website_for_brand,
     extract_brand_identity,
 )
@@ -64,6 +66,7 @@ __all__ = [
     "list_generated_images",
     # Style analysis
     "analyze_design_style",
+    "analyze_design_style_batch",
     "get_style_context",
     "list_analyzed_styles",
     "compare_styles",
@@ -75,6 +78,7 @@ __all__ = [
     "delete_knowledge_document",
     # URL scraping
     "scrape_brand_from_url",
+    "scrape_brands_batch",
     "crawl_website_for_brand",
     "extract_brand_identity",
     # Code generation
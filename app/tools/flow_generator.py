@@ -7,6 +7,8 @@ complex workflows like DQAI and Carveout processes.
 
 import json
 import time
+import urllib.request
+import urllib.error
 from typing import Optional
 from langchain_core.tools import tool
 from google import genai
@@ -22,6 +24,9 @@ client = genai.Client(
 
 GEMINI_MODEL = "gemini-2.5-pro"
 
+# Frontend sandbox API URL
+SANDBOX_API_URL = "http://localhost:3000/api/generate"
+
 
 def log_progress(tool_name: str, step: str, details: str = ""):
     """Log progress for tool execution."""
@@ -595,11 +600,6 @@ export default function WorkflowPlan() {{
 
 def _save_workflow_to_sandbox(code: str, name: str, description: str = "") -> dict:
     """Save workflow component to the frontend sandbox."""
-    import urllib.request
-    import urllib.error
-    
-    SANDBOX_API_URL = "http://localhost:3000/api/generate"
-    
     try:
         data = {
             "code": code,
@@ -624,11 +624,6 @@ def _save_workflow_to_sandbox(code: str, name: str, description: str = "") -> di
 
 def _get_workflow_component_id() -> Optional[str]:
     """Find the current WorkflowPlan component ID by name."""
-    import urllib.request
-    import urllib.error
-    
-    SANDBOX_API_URL = "http://localhost:3000/api/generate"
-    
     try:
         req = urllib.request.Request(SANDBOX_API_URL, method='GET')
         with urllib.request.urlopen(req, timeout=10) as response:
@@ -653,11 +648,6 @@ def _update_workflow_in_sandbox(code: str, component_id: Optional[str] = None) -
     IMPORTANT: This function updates the component code in-place,
     preserving the step statuses embedded in the code.
     """
-    import urllib.request
-    import urllib.error
-    
-    SANDBOX_API_URL = "http://localhost:3000/api/generate"
-    
     try:
         # Always look up the current component ID by name (IDs can change!)
         current_id = _get_workflow_component_id()
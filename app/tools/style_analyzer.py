@@ -1,18 +1,31 @@
 """Style Analyzer Tool using Gemini 3 Pro Vision API."""
 
-import base64
+import contextvars
+import copy
+import functools
+import hashlib
+import io
 import json
-from typing import Optional
+import math
+import os
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
 
 from langchain_core.tools import tool
 from google import genai
 from google.genai import types
+from PIL import Image
 
-from app.config import GOOGLE_API_KEY
+from app.config import GOOGLE_API_KEY, GEMINI_WARMUP, DNA_CACHE_DIR
 from app.tools.tool_state import (
     get_image_from_state,
     get_all_images_from_state,
     get_business_dna,
+    get_business_dna_version,
     set_business_dna,
     has_business_dna,
     get_component_templates,
@@ -21,70 +34,71 @@ from app.tools.tool_state import (
 )
 
 
-# Initialize Gemini client with extended timeout for image processing
-client = genai.Client(
-    api_key=GOOGLE_API_KEY,
-    http_options={"timeout": 120000},  # 120 seconds timeout
-)
+@functools.cache
+def _get_client() -> genai.Client:
+    """Get the Gemini client, created on first use so importing this module stays cheap."""
+    # Extended timeout for image processing
+    return genai.Client(
+        api_key=GOOGLE_API_KEY,
+        http_options={"timeout": 120000},  # 120 seconds timeout
+    )
 
 # Model to use - using stable 2.5 Flash for reliability
 GEMINI_MODEL = "gemini-2.5-pro"
 
-# Store analyzed styles for reference
+
+def _warmup_client() -> None:
+    """Open the pooled HTTPS connection to Gemini ahead of the first real request."""
+    try:
+        # Model metadata lookup - not billed, but establishes DNS/TLS for the pool
+        _get_client().models.get(model=GEMINI_MODEL)
+        print("[OK] Gemini connection warmed up")
+    except Exception as e:
+        print(f"[WARNING] Gemini warm-up failed: {e}")
+
+
+if GEMINI_WARMUP == "true":
+    threading.Thread(target=_warmup_client, daemon=True).start()
+
+
+# Store analyzed styles for reference (insertion ordered, oldest evicted first)
+MAX_ANALYZED_STYLES = 256
 _analyzed_styles: dict[str, dict] = {}
+# Prebuilt list_analyzed_styles entries, kept in the same order as _analyzed_styles
+_style_index: list[dict] = []
 
+# Parsed style analyses keyed by (image hash, analysis focus), least recently used first
+ANALYSIS_CACHE_SIZE = 64
+_analysis_cache: OrderedDict[tuple[str, str], tuple[dict, str]] = OrderedDict()
 
-@tool
-def analyze_business_dna() -> dict:
-    """
-    Analyze ALL uploaded design images to extract PIXEL-PERFECT "Business DNA".
-    
-    This tool examines all uploaded reference images together to extract:
-    1. EXACT colors (hex codes) for every UI element
-    2. EXACT dimensions (header height, sidebar width in pixels)
-    3. EXACT typography (font sizes, weights, line heights)
-    4. EXACT effects (shadows, glows, borders with precise values)
-    5. Component templates (header, navbar, layout) as reusable JSX
-    
-    CALL THIS FIRST when a user uploads design reference images!
-    
-    The extracted DNA ensures generated screens look IDENTICAL to the
-    uploaded designs - same header, same navbar, same colors everywhere.
-    
-    Returns:
-        dict containing:
-        - success: Whether analysis succeeded
-        - image_count: Number of images analyzed
-        - business_dna: Pixel-perfect design tokens
-        - templates_generated: Whether component templates were created
-    """
-    try:
-        # Get ALL images from state
-        images = get_all_images_from_state()
-        
-        if not images:
-            return {
-                "success": False,
-                "error": "No images found. Please upload design reference images first.",
-            }
-        
-        print(f"  🧬 [PIXEL-PERFECT DNA] Analyzing {len(images)} images for exact extraction...")
-        
-        # Build content parts with all images
-        parts = []
-        for i, (img_bytes, mime_type) in enumerate(images):
-            print(f"      Processing image {i+1}: {len(img_bytes)} bytes")
-            parts.append(types.Part.from_bytes(data=img_bytes, mime_type=mime_type or "image/jpeg"))
-        
-        # PIXEL-PERFECT EXTRACTION PROMPT - ENHANCED FOR GRANULAR EXTRACTION
-        analysis_prompt = """You are an expert UI designer extracting PIXEL-PERFECT design specifications.
+# Longest edge (px) of images sent for style analysis
+STYLE_IMAGE_MAX_EDGE = 1568
 
-Analyze ALL provided images as a SINGLE app design system. Extract EXACT values - not approximations.
-Sample colors DIRECTLY from the pixels. Do not guess or use defaults.
+# Downscaled image Parts keyed by image hash, least recently used first
+IMAGE_PART_CACHE_SIZE = 16
+_image_part_cache: OrderedDict[str, types.Part] = OrderedDict()
+
+# Guards _analyzed_styles and _analysis_cache when analyses run on worker threads
+_styles_lock = threading.Lock()
+
+# Hex color codes (#RGB or #RRGGBB) inside analysis text
+_HEX_COLOR_RE = re.compile(r"#(?:[0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b")
+
+# Body of a markdown code fence (```json ... ```)
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+# Template code values in a (possibly truncated) JSON response
+_CODE_BLOCKS_RE = re.compile(r'"(header_code|navbar_code|layout_code)"\s*:\s*"((?:[^"\\]|\\.)*)"?', re.DOTALL)
+
+# Rendered Business DNA prompt, keyed by DNA version (rebuilt only when the DNA changes)
+_dna_prompt_cache: dict[int, str] = {}
+
+# Human-readable Business DNA summary, keyed by DNA version
+_dna_summary_cache: dict[int, str] = {}
 
-Return a STRICT JSON with these EXACT specifications:
 
-{
+# Business DNA specification - each value describes what to extract for that key
+BUSINESS_DNA_SPEC = """{
     "colors": {
         "header_bg": "#EXACT_HEX - header background color",
         "sidebar_bg": "#EXACT_HEX - sidebar/navbar background",
@@ -309,7 +323,17 @@ Return a STRICT JSON with these EXACT specifications:
         "company_name_visible": "Company Name if visible",
         "tagline": "any visible tagline"
     }
-}
+}"""
+
+# Pixel-perfect extraction prompt - enhanced for granular extraction
+BUSINESS_DNA_ANALYSIS_PROMPT = """You are an expert UI designer extracting PIXEL-PERFECT design specifications.
+
+Analyze ALL provided images as a SINGLE app design system. Extract EXACT values - not approximations.
+Sample colors DIRECTLY from the pixels. Do not guess or use defaults.
+
+Return a STRICT JSON with these EXACT specifications:
+
+""" + BUSINESS_DNA_SPEC + """
 
 CRITICAL INSTRUCTIONS - READ CAREFULLY:
 
@@ -341,51 +365,172 @@ CRITICAL INSTRUCTIONS - READ CAREFULLY:
 
 7. Output must be valid JSON"""
 
-        parts.append(types.Part.from_text(text=analysis_prompt))
+
+def _schema_from_spec(spec):
+    """Build a Gemini response schema mirroring the shape of a JSON spec/example."""
+    if isinstance(spec, dict):
+        return {
+            "type": "object",
+            "properties": {key: _schema_from_spec(value) for key, value in spec.items()},
+        }
+    if isinstance(spec, list):
+        return {"type": "array", "items": {"type": "string"}}
+    if isinstance(spec, bool):
+        return {"type": "boolean"}
+    return {"type": "string", "description": str(spec)}
+
+
+# Structured output schema for Business DNA extraction (derived from the spec above)
+BUSINESS_DNA_SCHEMA = _schema_from_spec(json.loads(BUSINESS_DNA_SPEC))
+
+# Component template prompt - formatted with the extracted DNA as `dna_json`
+COMPONENT_TEMPLATE_PROMPT = """You are an expert React developer. Generate EXACT pixel-perfect React component code.
+
+DESIGN DNA (use these EXACT values):
+{dna_json}
+
+Using the image and DNA above, generate THREE separate React components that can be REUSED across all screens:
+
+1. **HeaderTemplate** - The EXACT header from the image:
+   - Use exact colors from DNA (header_bg, text colors, etc.)
+   - Include logo/brand (position, colors from DNA brand section)
+   - Include notification bell with badge if present
+   - Include settings icon if present
+   - Include user avatar/menu (use avatar colors from DNA)
+   - Include any company selector dropdown
+
+2. **NavbarTemplate** - The EXACT navigation/stepper from the image:
+   - Use exact colors from DNA (navbar section)
+   - Include ALL step names from DNA (navbar.steps)
+   - Include active state styling (glow, border, background from DNA)
+   - Include completion checkmarks if present
+   - Pass activeStep as a prop to highlight current step
+
+3. **LayoutTemplate** - The shell that wraps content:
+   - Use exact background colors from DNA
+   - Include HeaderTemplate at top
+   - Include NavbarTemplate below header
+   - Include a {{children}} slot for page content
+   - Use exact padding/spacing from DNA dimensions
+
+Return as JSON with this structure:
+{{
+    "header_code": "// Full React component code for HeaderTemplate with exact Tailwind classes using DNA colors",
+    "navbar_code": "// Full React component code for NavbarTemplate with activeStep prop",
+    "layout_code": "// Full React component code for LayoutTemplate that uses Header and Navbar"
+}}
+
+CRITICAL RULES:
+1. Use EXACT hex codes from DNA in Tailwind arbitrary values: bg-[#111318], text-[#F8F9FA]
+2. Use EXACT dimensions: h-[64px], w-[72px], p-[32px]
+3. Include ALL icons from lucide-react that are visible
+4. The header and navbar must look IDENTICAL to the screenshot
+5. Make components self-contained with all imports
+6. Use TypeScript with proper types
+7. Export each component as default"""
+
+# Structured output schema for component template generation
+COMPONENT_TEMPLATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "header_code": {
+            "type": "string",
+            "description": "Full React component code for HeaderTemplate with exact Tailwind classes using DNA colors"
+        },
+        "navbar_code": {
+            "type": "string",
+            "description": "Full React component code for NavbarTemplate with activeStep prop"
+        },
+        "layout_code": {
+            "type": "string",
+            "description": "Full React component code for LayoutTemplate that uses Header and Navbar"
+        }
+    },
+    "required": ["header_code", "navbar_code", "layout_code"]
+}
+
+
+@tool
+def analyze_business_dna() -> dict:
+    """
+    Analyze ALL uploaded design images to extract PIXEL-PERFECT "Business DNA".
+    
+    This tool examines all uploaded reference images together to extract:
+    1. EXACT colors (hex codes) for every UI element
+    2. EXACT dimensions (header height, sidebar width in pixels)
+    3. EXACT typography (font sizes, weights, line heights)
+    4. EXACT effects (shadows, glows, borders with precise values)
+    5. Component templates (header, navbar, layout) as reusable JSX
+    
+    CALL THIS FIRST when a user uploads design reference images!
+    
+    The extracted DNA ensures generated screens look IDENTICAL to the
+    uploaded designs - same header, same navbar, same colors everywhere.
+    
+    Returns:
+        dict containing:
+        - success: Whether analysis succeeded
+        - image_count: Number of images analyzed
+        - business_dna: Pixel-perfect design tokens
+        - templates_generated: Whether component templates were created
+    """
+    try:
+        # Get ALL images from state
+        images = get_all_images_from_state()
         
-        # Call Gemini with all images
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=[
-                types.Content(role="user", parts=parts),
-            ],
-            config=types.GenerateContentConfig(
-                temperature=0.1,  # Very low temperature for precise extraction
-                max_output_tokens=8192,
-            ),
-        )
+        if not images:
+            return {
+                "success": False,
+                "error": "No images found. Please upload design reference images first.",
+            }
         
-        analysis_text = response.text
-        print(f"  🧬 [PIXEL-PERFECT DNA] Received analysis ({len(analysis_text)} chars)")
+        # Identical uploads add input tokens without adding information
+        unique_images = _dedupe_images(images)
+        if len(unique_images) < len(images):
+            print(f"  🧬 [PIXEL-PERFECT DNA] Skipping {len(images) - len(unique_images)} duplicate image(s)")
+        images = unique_images
         
-        # Parse the JSON response
-        try:
-            cleaned_text = analysis_text
-            if "```json" in cleaned_text:
-                cleaned_text = cleaned_text.split("```json")[1].split("```")[0]
-            elif "```" in cleaned_text:
-                cleaned_text = cleaned_text.split("```")[1].split("```")[0]
+        # Reuse a previous analysis of the exact same images (survives restarts and workers)
+        cache_key = _dna_cache_key(images)
+        cached = _load_cached_dna(cache_key)
+        if cached:
+            business_dna = cached["business_dna"]
+            templates = cached["templates"]
+            set_business_dna(business_dna)
+            set_component_templates(templates)
+            print(f"  ✅ [PIXEL-PERFECT DNA] Loaded cached DNA + templates for these images.")
             
-            business_dna = json.loads(cleaned_text.strip())
-        except json.JSONDecodeError as e:
-            print(f"  ⚠️ [PIXEL-PERFECT DNA] JSON parse failed: {e}")
-            business_dna = {"raw_analysis": analysis_text}
+            return {
+                "success": True,
+                "image_count": len(images),
+                "business_dna": business_dna,
+                "summary": _generate_dna_summary(business_dna),
+                "templates_generated": True,
+                "template_names": [k for k in templates.keys() if templates[k]],
+                "cached": True,
+                "message": f"Loaded cached pixel-perfect analysis of these {len(images)} images. Design DNA and component templates stored for all generations.",
+            }
         
-        # Add metadata
-        business_dna["_metadata"] = {
-            "image_count": len(images),
-            "model": GEMINI_MODEL,
-            "extraction_type": "pixel_perfect",
-        }
+        print(f"  🧬 [PIXEL-PERFECT DNA] Analyzing {len(images)} images for exact extraction...")
+        
+        business_dna = _extract_business_dna(images)
         
         # Store in tool state for automatic injection
         set_business_dna(business_dna)
         
-        # Now generate component templates from the DNA
+        # Now generate component templates from the DNA (they need its exact colors,
+        # so this can't start before the DNA call returns)
         print(f"  🎨 [PIXEL-PERFECT DNA] Generating component templates...")
         templates_result = _generate_component_templates_from_dna(business_dna, images)
         
-        # Generate a human-readable summary
+        # Persist complete results only, so a failed parse or template call is retried next time.
+        # The templates come from this call's result - the shared tool state may already hold
+        # another analysis's templates
+        if templates_result.get("success") and "raw_analysis" not in business_dna:
+            _save_cached_dna(cache_key, business_dna, templates_result["template_code"])
+        
+        # Generate a human-readable summary (set_business_dna just started a new DNA
+        # version, so there is nothing cached to reuse here)
         summary = _generate_dna_summary(business_dna)
         
         print(f"  ✅ [PIXEL-PERFECT DNA] Extraction complete! DNA + templates stored.")
@@ -409,6 +554,137 @@ CRITICAL INSTRUCTIONS - READ CAREFULLY:
         }
 
 
+def _dedupe_images(images: list) -> list:
+    """Drop byte-identical images, keeping the first occurrence of each."""
+    seen = set()
+    unique = []
+    for img_bytes, mime_type in images:
+        digest = hashlib.blake2b(img_bytes, digest_size=16).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        unique.append((img_bytes, mime_type))
+    return unique
+
+
+def _dna_cache_key(images: list) -> str:
+    """Content hash of the image set plus everything that shapes the analysis."""
+    key = hashlib.blake2b(digest_size=16)
+    key.update(GEMINI_MODEL.encode())
+    key.update(BUSINESS_DNA_ANALYSIS_PROMPT.encode())
+    key.update(COMPONENT_TEMPLATE_PROMPT.encode())
+    for img_bytes, _ in images:
+        key.update(hashlib.blake2b(img_bytes, digest_size=16).digest())
+    return key.hexdigest()
+
+
+def _load_cached_dna(cache_key: str) -> Optional[dict]:
+    """Load a persisted DNA analysis (business_dna + templates), if present."""
+    path = os.path.join(DNA_CACHE_DIR, f"{cache_key}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  ⚠️ [PIXEL-PERFECT DNA] Ignoring unreadable cache entry: {e}")
+        return None
+
+
+def _save_cached_dna(cache_key: str, business_dna: dict, templates: Optional[dict]) -> None:
+    """Persist a DNA analysis so other workers and restarts can skip the Gemini calls."""
+    path = os.path.join(DNA_CACHE_DIR, f"{cache_key}.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(DNA_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"business_dna": business_dna, "templates": templates}, f)
+        # Atomic rename - concurrent readers never see a partial file
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  ⚠️ [PIXEL-PERFECT DNA] Could not write cache entry: {e}")
+
+
+def _extract_palette(images: list, max_colors: int = 12) -> list[str]:
+    """
+    Measure the dominant colors of all images locally (most frequent first).
+    
+    Median-cut quantization over small thumbnails takes milliseconds and gives the
+    model real pixel values to assign roles to, instead of estimating every hex code.
+    """
+    try:
+        thumbs = []
+        for img_bytes, _ in images:
+            with Image.open(io.BytesIO(img_bytes)) as im:
+                # NEAREST keeps exact pixel colors (no blended edge colors)
+                thumbs.append(im.convert("RGB").resize((128, 128), Image.Resampling.NEAREST))
+        
+        combined = Image.new("RGB", (128 * len(thumbs), 128))
+        for i, thumb in enumerate(thumbs):
+            combined.paste(thumb, (128 * i, 0))
+        
+        quantized = combined.quantize(colors=max_colors, method=Image.Quantize.MEDIANCUT)
+        palette = quantized.getpalette()
+        counts = sorted(quantized.getcolors(), reverse=True)
+        return ["#%02X%02X%02X" % tuple(palette[idx * 3:idx * 3 + 3]) for _, idx in counts]
+    except Exception as e:
+        print(f"  ⚠️ [PIXEL-PERFECT DNA] Palette extraction failed: {e}")
+        return []
+
+
+def _extract_business_dna(images: list) -> dict:
+    """Extract the Business DNA design tokens from all images in one Gemini call."""
+    # Build content parts with all images
+    parts = [
+        types.Part.from_bytes(data=img_bytes, mime_type=mime_type or "image/jpeg")
+        for img_bytes, mime_type in images
+    ]
+    print(f"      Sending {len(images)} images ({sum(len(b) for b, _ in images)} bytes total)")
+    
+    parts.append(types.Part.from_text(text=BUSINESS_DNA_ANALYSIS_PROMPT))
+    
+    # Constrain colors to the locally measured palette
+    palette = _extract_palette(images)
+    if palette:
+        parts.append(types.Part.from_text(
+            text=f"Candidate palette measured from the pixels (most frequent first): {', '.join(palette)}\n"
+                 "Prefer these exact hex codes when an element's color matches one of them."
+        ))
+    
+    # Call Gemini with all images
+    response = _get_client().models.generate_content(
+        model=GEMINI_MODEL,
+        contents=[
+            types.Content(role="user", parts=parts),
+        ],
+        config=types.GenerateContentConfig(
+            temperature=0.1,  # Very low temperature for precise extraction
+            max_output_tokens=8192,
+            response_mime_type="application/json",
+            response_schema=BUSINESS_DNA_SCHEMA,
+        ),
+    )
+    
+    analysis_text = response.text
+    print(f"  🧬 [PIXEL-PERFECT DNA] Received analysis ({len(analysis_text)} chars)")
+    
+    # Parse structured JSON output (only fails if the response was truncated)
+    try:
+        business_dna = json.loads(analysis_text)
+    except json.JSONDecodeError as e:
+        print(f"  ⚠️ [PIXEL-PERFECT DNA] JSON parse failed: {e}")
+        business_dna = {"raw_analysis": analysis_text}
+    
+    # Add metadata
+    business_dna["_metadata"] = {
+        "image_count": len(images),
+        "model": GEMINI_MODEL,
+        "extraction_type": "pixel_perfect",
+    }
+    
+    return business_dna
+
+
 @tool
 def get_current_business_dna() -> dict:
     """
@@ -425,7 +701,7 @@ def get_current_business_dna() -> dict:
             "success": True,
             "has_business_dna": True,
             "business_dna": dna,
-            "summary": _generate_dna_summary(dna),
+            "summary": _get_dna_summary(dna),
         }
     return {
         "success": True,
@@ -434,6 +710,22 @@ def get_current_business_dna() -> dict:
     }
 
 
+def _get_dna_summary(dna: dict) -> str:
+    """
+    Get the summary for the stored Business DNA, building it once per DNA version.
+    
+    Used by get_current_business_dna, which is called repeatedly for the same DNA;
+    analyze_business_dna always has a new version and builds its summary directly.
+    """
+    version = get_business_dna_version()
+    cached = _dna_summary_cache.get(version)
+    if cached is None:
+        cached = _generate_dna_summary(dna)
+        _dna_summary_cache.clear()
+        _dna_summary_cache[version] = cached
+    return cached
+
+
 def _generate_dna_summary(dna: dict) -> str:
     """Generate a human-readable summary of the Business DNA."""
     parts = []
@@ -475,6 +767,8 @@ def _generate_component_templates_from_dna(dna: dict, images: list) -> dict:
     
     This creates actual JSX code that can be injected into all generated screens
     to ensure the header and navbar look IDENTICAL everywhere.
+    
+    On success the result includes the generated code under "template_code".
     """
     try:
         if not images:
@@ -486,53 +780,12 @@ def _generate_component_templates_from_dna(dna: dict, images: list) -> dict:
         img_bytes, mime_type = images[0]
         
         # Build the template generation prompt with DNA context
-        template_prompt = f"""You are an expert React developer. Generate EXACT pixel-perfect React component code.
-
-DESIGN DNA (use these EXACT values):
-{json.dumps(dna, indent=2)}
-
-Using the image and DNA above, generate THREE separate React components that can be REUSED across all screens:
-
-1. **HeaderTemplate** - The EXACT header from the image:
-   - Use exact colors from DNA (header_bg, text colors, etc.)
-   - Include logo/brand (position, colors from DNA brand section)
-   - Include notification bell with badge if present
-   - Include settings icon if present
-   - Include user avatar/menu (use avatar colors from DNA)
-   - Include any company selector dropdown
-
-2. **NavbarTemplate** - The EXACT navigation/stepper from the image:
-   - Use exact colors from DNA (navbar section)
-   - Include ALL step names from DNA (navbar.steps)
-   - Include active state styling (glow, border, background from DNA)
-   - Include completion checkmarks if present
-   - Pass activeStep as a prop to highlight current step
-
-3. **LayoutTemplate** - The shell that wraps content:
-   - Use exact background colors from DNA
-   - Include HeaderTemplate at top
-   - Include NavbarTemplate below header
-   - Include a {{children}} slot for page content
-   - Use exact padding/spacing from DNA dimensions
-
-Return as JSON with this structure:
-{{
-    "header_code": "// Full React component code for HeaderTemplate with exact Tailwind classes using DNA colors",
-    "navbar_code": "// Full React component code for NavbarTemplate with activeStep prop",
-    "layout_code": "// Full React component code for LayoutTemplate that uses Header and Navbar"
-}}
-
-CRITICAL RULES:
-1. Use EXACT hex codes from DNA in Tailwind arbitrary values: bg-[#111318], text-[#F8F9FA]
-2. Use EXACT dimensions: h-[64px], w-[72px], p-[32px]
-3. Include ALL icons from lucide-react that are visible
-4. The header and navbar must look IDENTICAL to the screenshot
-5. Make components self-contained with all imports
-6. Use TypeScript with proper types
-7. Export each component as default"""
+        # Compact JSON - the model reads it fine and it costs far fewer input tokens
+        dna_json = json.dumps(dna, separators=(",", ":"))
+        template_prompt = COMPONENT_TEMPLATE_PROMPT.format(dna_json=dna_json)
 
         # Call Gemini with the image
-        response = client.models.generate_content(
+        response = _get_client().models.generate_content(
             model=GEMINI_MODEL,
             contents=[
                 types.Content(
@@ -546,21 +799,17 @@ CRITICAL RULES:
             config=types.GenerateContentConfig(
                 temperature=0.2,
                 max_output_tokens=16384,
+                response_mime_type="application/json",
+                response_schema=COMPONENT_TEMPLATE_SCHEMA,
             ),
         )
         
         response_text = response.text
         print(f"  🎨 [TEMPLATES] Received template code ({len(response_text)} chars)")
         
-        # Parse the JSON response
+        # Parse structured JSON output (only fails if the response was truncated)
         try:
-            cleaned_text = response_text
-            if "```json" in cleaned_text:
-                cleaned_text = cleaned_text.split("```json")[1].split("```")[0]
-            elif "```" in cleaned_text:
-                cleaned_text = cleaned_text.split("```")[1].split("```")[0]
-            
-            templates = json.loads(cleaned_text.strip())
+            templates = json.loads(response_text)
         except json.JSONDecodeError as e:
             print(f"  ⚠️ [TEMPLATES] JSON parse failed, extracting code blocks: {e}")
             # Try to extract code blocks manually
@@ -576,6 +825,7 @@ CRITICAL RULES:
             return {
                 "success": True,
                 "templates": template_names,
+                "template_code": templates,
             }
         else:
             print(f"  ⚠️ [TEMPLATES] No templates could be extracted")
@@ -588,28 +838,18 @@ CRITICAL RULES:
 
 
 def _extract_code_blocks_from_response(text: str) -> dict:
-    """Extract code blocks from response if JSON parsing fails."""
+    """Extract code blocks from response if JSON parsing fails (e.g. truncated output)."""
     templates = {}
     
-    # Look for header code
-    if "HeaderTemplate" in text or "header_code" in text:
-        # Try to find the code block
-        import re
-        header_match = re.search(r'header_code["\s:]+[`\'"]*(.*?)[`\'"]*(?=,\s*["\']navbar|$)', text, re.DOTALL)
-        if header_match:
-            templates["header_code"] = header_match.group(1).strip()
-    
-    # Look for navbar code
-    if "NavbarTemplate" in text or "navbar_code" in text:
-        navbar_match = re.search(r'navbar_code["\s:]+[`\'"]*(.*?)[`\'"]*(?=,\s*["\']layout|$)', text, re.DOTALL)
-        if navbar_match:
-            templates["navbar_code"] = navbar_match.group(1).strip()
-    
-    # Look for layout code  
-    if "LayoutTemplate" in text or "layout_code" in text:
-        layout_match = re.search(r'layout_code["\s:]+[`\'"]*(.*?)[`\'"]*(?=\s*}|$)', text, re.DOTALL)
-        if layout_match:
-            templates["layout_code"] = layout_match.group(1).strip()
+    # Single pass over the response; the closing quote is optional so a value
+    # cut off by truncation is still recovered
+    for match in _CODE_BLOCKS_RE.finditer(text):
+        raw_code = match.group(2)
+        try:
+            code = json.loads(f'"{raw_code}"')
+        except json.JSONDecodeError:
+            code = raw_code
+        templates[match.group(1)] = code.strip()
     
     return templates
 
@@ -619,7 +859,13 @@ def get_business_dna_for_prompt() -> str:
     Get the Business DNA formatted for injection into generation prompts.
     
     This is called internally by code_generator.py to inject style context.
+    The rendered string is cached until the DNA changes.
     """
+    version = get_business_dna_version()
+    cached = _dna_prompt_cache.get(version)
+    if cached is not None:
+        return cached
+    
     dna = get_business_dna()
     if not dna:
         return ""
@@ -659,44 +905,18 @@ def get_business_dna_for_prompt() -> str:
     
     prompt_parts.append("\n=== END BUSINESS DNA ===\n")
     
-    return "\n".join(prompt_parts)
+    prompt = "\n".join(prompt_parts)
+    _dna_prompt_cache.clear()
+    _dna_prompt_cache[version] = prompt
+    return prompt
 
 
-@tool
-def analyze_design_style(
-    image_name: Optional[str] = None,
-    analysis_focus: str = "comprehensive",
-) -> dict:
-    """
-    Analyze an uploaded design image to extract its visual style characteristics.
-    
-    This tool uses Gemini 3 Pro's vision capabilities to understand colors, typography,
-    layout patterns, and overall design language from uploaded design assets.
-    
-    The image is automatically extracted from the user's message - you don't need
-    to pass the image data, just call this tool.
-    
-    Args:
-        image_name: Optional name/identifier for this design asset.
-        analysis_focus: What aspects to focus on. Options:
-                       - "comprehensive": Full analysis of all design aspects
-                       - "colors": Focus on color palette and usage
-                       - "typography": Focus on fonts and text styling
-                       - "layout": Focus on spacing, grid, and composition
-                       - "branding": Focus on brand identity elements
-    
-    Returns:
-        dict containing:
-        - style_id: Unique identifier for this analyzed style
-        - color_palette: Extracted colors with hex codes and usage
-        - typography: Font characteristics and hierarchy
-        - layout_patterns: Spacing, grid, and composition details
-        - design_language: Overall style description
-        - recommendations: How to apply this style to new designs
-    """
-    # Build analysis prompt based on focus
-    focus_prompts = {
-        "comprehensive": """Analyze this design comprehensively and extract:
+# Valid analyze_design_style focuses - a Literal so the tool schema exposes them as an enum
+AnalysisFocus = Literal["comprehensive", "colors", "typography", "layout", "branding"]
+
+# Analysis prompts for analyze_design_style, one per analysis focus
+STYLE_FOCUS_PROMPTS = {
+    "comprehensive": """Analyze this design comprehensively and extract:
 
 1. COLOR PALETTE:
    - Primary color (hex code)
@@ -731,7 +951,7 @@ def analyze_design_style(
 
 Provide the analysis in a structured JSON format.""",
 
-        "colors": """Focus specifically on the color palette in this design:
+    "colors": """Focus specifically on the color palette in this design:
 
 1. List ALL colors you can identify with their hex codes
 2. Categorize each color's role (primary, secondary, accent, background, text)
@@ -741,7 +961,7 @@ Provide the analysis in a structured JSON format.""",
 
 Return as structured JSON with hex codes.""",
 
-        "typography": """Analyze the typography in this design:
+    "typography": """Analyze the typography in this design:
 
 1. Identify font characteristics (serif, sans-serif, display, monospace)
 2. Describe the type scale (heading sizes relative to body)
@@ -752,7 +972,7 @@ Return as structured JSON with hex codes.""",
 
 Return as structured JSON.""",
 
-        "layout": """Analyze the layout and composition:
+    "layout": """Analyze the layout and composition:
 
 1. Identify the grid system or layout structure
 2. Measure approximate spacing patterns
@@ -763,7 +983,7 @@ Return as structured JSON.""",
 
 Return as structured JSON.""",
 
-        "branding": """Extract brand identity elements:
+    "branding": """Extract brand identity elements:
 
 1. Logo characteristics and placement
 2. Brand colors and their application
@@ -772,9 +992,132 @@ Return as structured JSON.""",
 5. Unique stylistic elements that define the brand
 
 Return as structured JSON.""",
-    }
+}
 
-    analysis_prompt = focus_prompts.get(analysis_focus, focus_prompts["comprehensive"])
+# Structured output schemas for analyze_design_style, one per analysis focus
+_COLOR_PALETTE_SPEC = {
+    "primary": "Primary color hex code",
+    "secondary": ["Secondary color hex codes"],
+    "accent": ["Accent color hex codes"],
+    "background": ["Background color hex codes"],
+    "text": ["Text color hex codes"],
+    "usage": "How the colors are used (buttons, headers, accents, etc.)",
+}
+_TYPOGRAPHY_SPEC = {
+    "font_characteristics": "Serif, sans-serif, display or monospace, with estimated font families",
+    "heading_style": "Heading font family, weight and size relationship to body",
+    "body_style": "Body text style",
+    "caption_style": "Caption/small text style",
+    "font_weights": ["Font weights used"],
+    "line_height_and_spacing": "Line heights and letter spacing",
+    "hierarchy": "Text hierarchy, alignment and emphasis patterns",
+}
+_LAYOUT_SPEC = {
+    "grid_system": "Grid system or layout structure",
+    "spacing_scale": "Spacing scale (tight, normal, loose) with approximate values",
+    "component_arrangement": "Component arrangement patterns",
+    "alignment": "Alignment principles used",
+    "visual_hierarchy": "Visual hierarchy and flow",
+    "responsive_hints": "Responsive design hints",
+}
+_DESIGN_ELEMENTS_SPEC = {
+    "border_radius": "Border radius style (sharp, rounded, pill)",
+    "shadows": "Shadow usage",
+    "icon_style": "Icon style (outlined, filled, duotone)",
+    "image_treatment": "Image treatment",
+}
+_OVERALL_STYLE_SPEC = {
+    "design_trend": "Design era/trend (modern, minimal, playful, corporate, etc.)",
+    "mood": "Mood/feeling",
+    "audience_impression": "Target audience impression",
+}
+
+STYLE_ANALYSIS_SCHEMAS = {
+    "comprehensive": _schema_from_spec({
+        "color_palette": _COLOR_PALETTE_SPEC,
+        "typography": _TYPOGRAPHY_SPEC,
+        "layout": _LAYOUT_SPEC,
+        "design_elements": _DESIGN_ELEMENTS_SPEC,
+        "overall_style": _OVERALL_STYLE_SPEC,
+    }),
+    "colors": _schema_from_spec({
+        "color_palette": {
+            **_COLOR_PALETTE_SPEC,
+            "all_colors": ["Every identified color as a hex code"],
+            "relationships": "Color relationships (complementary, analogous, etc.)",
+            "gradients": ["Gradients or color transitions"],
+            "mood": "Overall color mood (warm, cool, vibrant, muted)",
+        },
+    }),
+    "typography": _schema_from_spec({
+        "typography": {
+            **_TYPOGRAPHY_SPEC,
+            "decorative_treatments": ["Decorative text treatments"],
+        },
+    }),
+    "layout": _schema_from_spec({
+        "layout": _LAYOUT_SPEC,
+    }),
+    "branding": _schema_from_spec({
+        "branding": {
+            "logo": "Logo characteristics and placement",
+            "motifs": ["Consistent design motifs or patterns"],
+            "personality": "Brand personality conveyed",
+            "unique_elements": ["Unique stylistic elements that define the brand"],
+        },
+        "color_palette": _COLOR_PALETTE_SPEC,
+        "overall_style": _OVERALL_STYLE_SPEC,
+    }),
+}
+
+# Structured output schema for compare_styles
+STYLE_COMPARISON_SCHEMA = _schema_from_spec({
+    "similarities": ["Shared design elements, colors or patterns"],
+    "differences": ["Differences in approach, mood or execution"],
+    "compatibility": "How well the two styles could be combined",
+    "recommendations": ["How to create a design that incorporates both styles"],
+})
+
+
+@tool
+def analyze_design_style(
+    image_name: Optional[str] = None,
+    analysis_focus: AnalysisFocus = "comprehensive",
+) -> dict:
+    """
+    Analyze an uploaded design image to extract its visual style characteristics.
+    
+    This tool uses Gemini 3 Pro's vision capabilities to understand colors, typography,
+    layout patterns, and overall design language from uploaded design assets.
+    
+    The image is automatically extracted from the user's message - you don't need
+    to pass the image data, just call this tool.
+    
+    Args:
+        image_name: Optional name/identifier for this design asset.
+        analysis_focus: What aspects to focus on. Options:
+                       - "comprehensive": Full analysis of all design aspects
+                       - "colors": Focus on color palette and usage
+                       - "typography": Focus on fonts and text styling
+                       - "layout": Focus on spacing, grid, and composition
+                       - "branding": Focus on brand identity elements
+    
+    Returns:
+        dict containing:
+        - style_id: Unique identifier for this analyzed style
+        - color_palette: Extracted colors with hex codes and usage
+        - typography: Font characteristics and hierarchy
+        - layout_patterns: Spacing, grid, and composition details
+        - design_language: Overall style description
+        - recommendations: How to apply this style to new designs
+    """
+    if analysis_focus not in STYLE_FOCUS_PROMPTS:
+        return {
+            "error": f"Unknown analysis_focus '{analysis_focus}'. Options: {', '.join(STYLE_FOCUS_PROMPTS)}",
+        }
+    
+    analysis_prompt = STYLE_FOCUS_PROMPTS[analysis_focus]
+    analysis_schema = STYLE_ANALYSIS_SCHEMAS[analysis_focus]
     
     try:
         # Get image from tool state (extracted by middleware)
@@ -785,55 +1128,42 @@ Return as structured JSON.""",
                 "error": "No image found. Please upload an image first.",
             }
         
-        print(f"  🎨 [ANALYZE_STYLE] Processing image: {len(image_bytes)} bytes, mime: {media_type}")
-        
-        # Analyze with Gemini 3 Pro Vision
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=[
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_bytes(data=image_bytes, mime_type=media_type or "image/jpeg"),
-                        types.Part.from_text(text=analysis_prompt),
-                    ],
-                ),
-            ],
-            config=types.GenerateContentConfig(
-                temperature=0.3,
-                max_output_tokens=4096,
-            ),
-        )
-        
-        analysis_text = response.text
-        
-        # Try to parse as JSON, otherwise structure the response
-        try:
-            # Clean up the response if it's wrapped in markdown code blocks
-            cleaned_text = analysis_text
-            if "```json" in cleaned_text:
-                cleaned_text = cleaned_text.split("```json")[1].split("```")[0]
-            elif "```" in cleaned_text:
-                cleaned_text = cleaned_text.split("```")[1].split("```")[0]
-            
-            analysis_data = json.loads(cleaned_text)
-        except json.JSONDecodeError:
-            # Structure as text analysis
-            analysis_data = {"raw_analysis": analysis_text}
+        # Same image + focus analyzed before? Skip the Gemini round-trip
+        cache_key = (hashlib.blake2b(image_bytes, digest_size=16).hexdigest(), analysis_focus)
+        with _styles_lock:
+            cached = _analysis_cache.get(cache_key)
+            if cached is not None:
+                _analysis_cache.move_to_end(cache_key)
+        # Each style guide gets its own copy - cached analyses are never handed out directly
+        if cached is not None:
+            analysis_data, style_summary = copy.deepcopy(cached[0]), cached[1]
+            print(f"  🎨 [ANALYZE_STYLE] Reusing cached '{analysis_focus}' analysis for this image")
+        else:
+            image_part = _get_image_part(cache_key[0], image_bytes, media_type)
+            analysis_data, style_summary = _run_style_analysis(image_part, analysis_prompt, analysis_schema)
+            with _styles_lock:
+                _analysis_cache[cache_key] = (copy.deepcopy(analysis_data), style_summary)
+                if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    _analysis_cache.popitem(last=False)
         
-        # Generate style ID
-        style_id = f"style_{image_name or 'unnamed'}_{len(_analyzed_styles)}"
+        # Random suffix: unique even when analyses finish concurrently
+        style_id = f"style_{image_name or 'unnamed'}_{secrets.token_hex(4)}"
         
         # Create comprehensive style guide
         style_guide = {
             "style_id": style_id,
             "analysis_focus": analysis_focus,
             "analysis": analysis_data,
-            "style_summary": _generate_style_summary(analysis_data, analysis_text),
+            "style_summary": style_summary,
         }
         
-        # Store for later reference
-        _analyzed_styles[style_id] = style_guide
+        with _styles_lock:
+            # Store for later reference, dropping the oldest styles beyond the limit
+            _analyzed_styles[style_id] = style_guide
+            _style_index.append({"style_id": style_id, "analysis_focus": analysis_focus})
+            while len(_analyzed_styles) > MAX_ANALYZED_STYLES:
+                del _analyzed_styles[next(iter(_analyzed_styles))]
+                del _style_index[0]
         
         return {
             "success": True,
@@ -847,30 +1177,177 @@ Return as structured JSON.""",
         }
 
 
+@tool
+def analyze_design_style_batch(
+    analysis_focuses: list[AnalysisFocus],
+    image_name: Optional[str] = None,
+) -> dict:
+    """
+    Analyze the uploaded design image with several focuses at once.
+    
+    Runs one analyze_design_style per focus in parallel, so e.g. "comprehensive"
+    plus "colors" takes about as long as a single analysis.
+    
+    Args:
+        analysis_focuses: Focuses to analyze (see analyze_design_style for options),
+                          e.g. ["comprehensive", "colors"].
+        image_name: Optional name/identifier for this design asset.
+    
+    Returns:
+        dict with one analyze_design_style result per focus, in the same order
+    """
+    focuses = list(dict.fromkeys(analysis_focuses)) or ["comprehensive"]
+    
+    # Worker threads don't inherit context, so run each in a copy (it holds the uploaded image)
+    with ThreadPoolExecutor(max_workers=len(focuses)) as executor:
+        results = list(executor.map(
+            lambda focus, ctx: ctx.run(analyze_design_style.func, image_name=image_name, analysis_focus=focus),
+            focuses,
+            [contextvars.copy_context() for _ in focuses],
+        ))
+    
+    return {
+        "success": any(result.get("success") for result in results),
+        "count": len(results),
+        "styles": results,
+    }
+
+
+def _downscale_image(image_bytes: bytes, media_type: Optional[str]) -> tuple[bytes, Optional[str]]:
+    """
+    Shrink an image to at most STYLE_IMAGE_MAX_EDGE px on its longest side.
+    
+    Style analysis only needs the overall look, and Gemini tiles large images anyway,
+    so a 4K screenshot costs upload time and image tokens for no extra insight.
+    Images already small enough (or unreadable) are returned unchanged.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as im:
+            if max(im.size) <= STYLE_IMAGE_MAX_EDGE:
+                return image_bytes, media_type
+            im.thumbnail((STYLE_IMAGE_MAX_EDGE, STYLE_IMAGE_MAX_EDGE), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            if im.mode in ("RGBA", "LA", "P"):
+                # Keep transparency - JPEG would flatten it onto black
+                im.save(buf, format="PNG")
+                resized = buf.getvalue(), "image/png"
+            else:
+                im.convert("RGB").save(buf, format="JPEG", quality=85)
+                resized = buf.getvalue(), "image/jpeg"
+    except Exception as e:
+        print(f"  ⚠️ [ANALYZE_STYLE] Could not downscale image: {e}")
+        return image_bytes, media_type
+    
+    print(f"  🎨 [ANALYZE_STYLE] Downscaled image: {len(image_bytes)} -> {len(resized[0])} bytes")
+    return resized
+
+
+def _get_image_part(image_digest: str, image_bytes: bytes, media_type: Optional[str]) -> types.Part:
+    """
+    Get the (downscaled) image Part for an image, built once per image digest.
+    
+    Analyzing one image with several focuses reuses the same Part, so the
+    resize and Part construction happen once instead of once per focus.
+    """
+    with _styles_lock:
+        image_part = _image_part_cache.get(image_digest)
+        if image_part is not None:
+            _image_part_cache.move_to_end(image_digest)
+            return image_part
+    
+    image_bytes, media_type = _downscale_image(image_bytes, media_type)
+    print(f"  🎨 [ANALYZE_STYLE] Processing image: {len(image_bytes)} bytes, mime: {media_type}")
+    image_part = types.Part.from_bytes(data=image_bytes, mime_type=media_type or "image/jpeg")
+    
+    with _styles_lock:
+        _image_part_cache[image_digest] = image_part
+        if len(_image_part_cache) > IMAGE_PART_CACHE_SIZE:
+            _image_part_cache.popitem(last=False)
+    return image_part
+
+
+def _run_style_analysis(
+    image_part: types.Part,
+    analysis_prompt: str,
+    analysis_schema: dict,
+) -> tuple[dict, str]:
+    """Run one Gemini vision analysis and return (analysis_data, style_summary)."""
+    # Analyze with Gemini 3 Pro Vision - JSON mode, so no markdown fences to strip
+    response = _get_client().models.generate_content(
+        model=GEMINI_MODEL,
+        contents=[
+            types.Content(
+                role="user",
+                parts=[
+                    image_part,
+                    types.Part.from_text(text=analysis_prompt),
+                ],
+            ),
+        ],
+        config=types.GenerateContentConfig(
+            temperature=0.3,
+            max_output_tokens=4096,
+            response_mime_type="application/json",
+            response_schema=analysis_schema,
+        ),
+    )
+    
+    analysis_text = response.text or ""
+    
+    try:
+        analysis_data = _loads_json_response(analysis_text)
+    except json.JSONDecodeError:
+        # Only reachable if the response was cut off at max_output_tokens
+        analysis_data = {"raw_analysis": analysis_text}
+    
+    return analysis_data, _generate_style_summary(analysis_data, analysis_text)
+
+
+def _loads_json_response(text: str):
+    """
+    Parse a JSON-mode response, tolerating a markdown fence around it.
+    
+    JSON mode should never fence its output; the fence fallback is a single
+    precompiled regex pass kept as a safety net. Raises json.JSONDecodeError.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        match = _FENCE_RE.search(text)
+        if not match:
+            raise
+        return json.loads(match.group(1))
+
+
+def _dumps_sorted(value) -> str:
+    """Compact JSON with sorted keys, so the same analysis always yields the same prompt text."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+# Style summary lines: (label, analysis keys to take the value from, in order of preference)
+_SUMMARY_SECTIONS = (
+    ("Colors", ("color_palette", "colors")),
+    ("Typography", ("typography",)),
+    ("Layout", ("layout", "layout_patterns")),
+    ("Style", ("design_language", "overall_style")),
+)
+
+
 def _generate_style_summary(analysis_data: dict, raw_text: str) -> str:
     """Generate a concise style summary for use in generation prompts."""
-    summary_parts = []
+    if not isinstance(analysis_data, dict) or "raw_analysis" in analysis_data:
+        # Unparsed response - none of the sections can be present
+        return raw_text[:1000]
     
-    if isinstance(analysis_data, dict):
-        if "color_palette" in analysis_data or "colors" in analysis_data:
-            colors = analysis_data.get("color_palette") or analysis_data.get("colors", {})
-            if isinstance(colors, dict):
-                summary_parts.append(f"Colors: {json.dumps(colors)}")
-        
-        if "typography" in analysis_data:
-            summary_parts.append(f"Typography: {json.dumps(analysis_data['typography'])}")
-        
-        if "layout" in analysis_data or "layout_patterns" in analysis_data:
-            layout = analysis_data.get("layout") or analysis_data.get("layout_patterns", {})
-            summary_parts.append(f"Layout: {json.dumps(layout)}")
-        
-        if "design_language" in analysis_data or "overall_style" in analysis_data:
-            style = analysis_data.get("design_language") or analysis_data.get("overall_style", "")
-            summary_parts.append(f"Style: {style}")
+    summary_parts = []
+    for label, keys in _SUMMARY_SECTIONS:
+        value = next((analysis_data[key] for key in keys if analysis_data.get(key)), None)
+        if value:
+            summary_parts.append(f"{label}: {value if isinstance(value, str) else _dumps_sorted(value)}")
     
     if not summary_parts:
         # Use raw text as fallback
-        return raw_text[:1000] if len(raw_text) > 1000 else raw_text
+        return raw_text[:1000]
     
     return "\n".join(summary_parts)
 
@@ -913,32 +1390,100 @@ def list_analyzed_styles() -> dict:
     Returns:
         dict with count and list of style IDs with their analysis focus
     """
+    with _styles_lock:
+        styles = list(_style_index)
     return {
-        "count": len(_analyzed_styles),
-        "styles": [
-            {
-                "style_id": style_id,
-                "analysis_focus": data["analysis_focus"],
-            }
-            for style_id, data in _analyzed_styles.items()
-        ],
+        "count": len(styles),
+        "styles": styles,
+    }
+
+
+def _hex_to_lab(hex_code: str) -> tuple[float, float, float]:
+    """Convert a #RRGGBB color to CIE L*a*b* (D65)."""
+    def linear(channel: int) -> float:
+        c = channel / 255
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+    
+    r, g, b = (linear(int(hex_code[i:i + 2], 16)) for i in (1, 3, 5))
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+    
+    def f(t: float) -> float:
+        return t ** (1 / 3) if t > 0.008856 else 7.787 * t + 16 / 116
+    
+    fx, fy, fz = f(x), f(y), f(z)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+def _palette_colors(analysis: dict) -> set[str]:
+    """All hex colors mentioned in an analysis' color palette, normalized to #RRGGBB."""
+    palette = analysis.get("color_palette") or analysis.get("colors") or {}
+    colors = set()
+    for match in _HEX_COLOR_RE.findall(json.dumps(palette)):
+        hex_digits = match[1:].upper()
+        if len(hex_digits) == 3:
+            hex_digits = "".join(c * 2 for c in hex_digits)
+        colors.add("#" + hex_digits)
+    return colors
+
+
+def _structural_diff(analysis_1: dict, analysis_2: dict) -> dict:
+    """
+    Compare two style analyses without an LLM call.
+    
+    color_distance is the mean CIE76 delta-E from each color to its closest
+    counterpart in the other palette (0 = identical, < ~5 = hard to tell apart).
+    """
+    colors_1, colors_2 = _palette_colors(analysis_1), _palette_colors(analysis_2)
+    color_distance = None
+    if colors_1 and colors_2:
+        labs_1 = [_hex_to_lab(c) for c in colors_1]
+        labs_2 = [_hex_to_lab(c) for c in colors_2]
+        nearest = [min(math.dist(lab, other) for other in labs_2) for lab in labs_1]
+        nearest += [min(math.dist(lab, other) for other in labs_1) for lab in labs_2]
+        color_distance = round(sum(nearest) / len(nearest), 2)
+    
+    sections = {}
+    for section in sorted(analysis_1.keys() | analysis_2.keys()):
+        section_1, section_2 = analysis_1.get(section), analysis_2.get(section)
+        if not isinstance(section_1, dict) or not isinstance(section_2, dict):
+            continue
+        shared_keys = section_1.keys() & section_2.keys()
+        sections[section] = {
+            "matching": sorted(k for k in shared_keys if section_1[k] == section_2[k]),
+            "differing": sorted(k for k in shared_keys if section_1[k] != section_2[k]),
+            "only_in_style_1": sorted(section_1.keys() - section_2.keys()),
+            "only_in_style_2": sorted(section_2.keys() - section_1.keys()),
+        }
+    
+    return {
+        "shared_colors": sorted(colors_1 & colors_2),
+        "color_distance": color_distance,
+        "sections": sections,
     }
 
 
 @tool
-def compare_styles(style_id_1: str, style_id_2: str) -> dict:
+def compare_styles(style_id_1: str, style_id_2: str, narrative: bool = False) -> dict:
     """
     Compare two analyzed design styles to identify similarities and differences.
     
     Useful for understanding how different designs relate and creating
     designs that bridge multiple style influences.
     
+    A structural diff (shared colors, color distance, matching/differing fields)
+    is computed locally and returned instantly. Set narrative=True to also get
+    a written comparison with compatibility notes and recommendations.
+    
     Args:
         style_id_1: First style ID to compare
         style_id_2: Second style ID to compare
+        narrative: Also ask Gemini for similarities, differences, compatibility
+                   and recommendations (slower)
         
     Returns:
-        dict with comparison analysis
+        dict with structural_diff, plus comparison when narrative=True
     """
     if style_id_1 not in _analyzed_styles:
         return {"error": f"Style '{style_id_1}' not found"}
@@ -948,6 +1493,15 @@ def compare_styles(style_id_1: str, style_id_2: str) -> dict:
     style1 = _analyzed_styles[style_id_1]
     style2 = _analyzed_styles[style_id_2]
     
+    structural_diff = _structural_diff(style1["analysis"], style2["analysis"])
+    if not narrative:
+        return {
+            "success": True,
+            "style_1": style_id_1,
+            "style_2": style_id_2,
+            "structural_diff": structural_diff,
+        }
+    
     # Use Gemini to compare the styles
     try:
         comparison_prompt = f"""Compare these two design style analyses and identify:
@@ -958,27 +1512,35 @@ def compare_styles(style_id_1: str, style_id_2: str) -> dict:
 4. RECOMMENDATIONS: How to create a design that incorporates both styles
 
 STYLE 1:
-{json.dumps(style1['analysis'], indent=2)}
+{json.dumps(style1['analysis'], indent=2, sort_keys=True)}
 
 STYLE 2:
-{json.dumps(style2['analysis'], indent=2)}
+{json.dumps(style2['analysis'], indent=2, sort_keys=True)}
 
 Provide a structured comparison."""
 
-        response = client.models.generate_content(
+        response = _get_client().models.generate_content(
             model=GEMINI_MODEL,
             contents=comparison_prompt,
             config=types.GenerateContentConfig(
                 temperature=0.3,
                 max_output_tokens=4096,
+                response_mime_type="application/json",
+                response_schema=STYLE_COMPARISON_SCHEMA,
             ),
         )
         
+        try:
+            comparison = _loads_json_response(response.text or "")
+        except json.JSONDecodeError:
+            comparison = response.text
+        
         return {
             "success": True,
             "style_1": style_id_1,
             "style_2": style_id_2,
-            "comparison": response.text,
+            "structural_diff": structural_diff,
+            "comparison": comparison,
             "model_used": GEMINI_MODEL,
         }
         
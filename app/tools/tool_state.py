@@ -6,70 +6,85 @@ available to tools without the agent needing to pass them.
 Also stores the analyzed "Business DNA" - the design style extracted from
 uploaded reference images that persists across the session.
 """
-from typing import Optional, Any
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
 
 
-# Global state dictionary
-_tool_state: dict = {
-    "images": [],           # List of (bytes, mime) tuples - ALL uploaded images
-    "image_data": None,     # Single image (backward compatibility)
-    "image_mime": None,     # Single image mime (backward compatibility)
-    "business_dna": None,   # Analyzed design style context (persists across session)
-    "component_templates": None,  # Extracted component templates (header, navbar, layout)
-}
+@dataclass(slots=True)
+class ToolState:
+    """Session-wide data shared between tools (survives across agent runs)."""
+    business_dna: Optional[dict] = None          # Analyzed design style context (persists across session)
+    component_templates: Optional[dict] = None   # Extracted component templates (header, navbar, layout)
 
 
-def get_tool_state() -> dict:
+# Global state
+_state = ToolState()
+
+# Uploaded images belong to a single request, so they live in a ContextVar:
+# concurrent runs each see only the images from their own messages.
+# The list is always replaced, never mutated, so the shared default is safe.
+_request_images: ContextVar[list[tuple[bytes, str]]] = ContextVar("_request_images", default=[])
+
+# Bumped on every Business DNA change so derived values (e.g. prompt strings) can be cached
+_dna_version: int = 0
+
+
+def get_tool_state() -> ToolState:
     """Get the current tool state."""
-    return _tool_state
+    return _state
 
 
-def set_tool_state(state: dict) -> None:
+def set_tool_state(state: ToolState) -> None:
     """Set the tool state."""
-    global _tool_state
-    _tool_state = state
+    global _state, _dna_version
+    _state = state
+    _dna_version += 1
 
 
 # === Multi-Image Support ===
 
 def get_all_images_from_state() -> list[tuple[bytes, str]]:
-    """Get ALL images from tool state."""
-    return _tool_state.get("images", [])
+    """
+    Get ALL images uploaded with the current request.
+    
+    Images are stored as raw bytes - the middleware decodes base64 once at ingest,
+    so tools can pass them straight to types.Part.from_bytes without re-decoding.
+    """
+    return _request_images.get()
 
 
 def set_images_in_state(images: list[tuple[bytes, str]]) -> None:
-    """Set multiple images in tool state."""
-    _tool_state["images"] = images
-    # Also set single image for backward compatibility
-    if images:
-        _tool_state["image_data"] = images[0][0]
-        _tool_state["image_mime"] = images[0][1]
-    else:
-        _tool_state["image_data"] = None
-        _tool_state["image_mime"] = None
+    """
+    Set the images for the current request (visible to code run in this context).
+    
+    Buffers are frozen to immutable bytes once here, so every tool shares the same
+    object by reference and nothing downstream can mutate or re-copy it.
+    """
+    _request_images.set([(_as_bytes(data), mime) for data, mime in images])
 
 
 def get_image_from_state() -> tuple[bytes | None, str | None]:
     """Get first image data and mime type from tool state (backward compatible)."""
-    return _tool_state.get("image_data"), _tool_state.get("image_mime")
+    images = _request_images.get()
+    if images:
+        return images[0]
+    return None, None
 
 
 def set_image_in_state(image_data: bytes | None, image_mime: str | None) -> None:
     """Set single image data in tool state (backward compatible)."""
-    _tool_state["image_data"] = image_data
-    _tool_state["image_mime"] = image_mime
-    # Also update images list
-    if image_data:
-        _tool_state["images"] = [(image_data, image_mime)]
-    else:
-        _tool_state["images"] = []
+    _request_images.set([(_as_bytes(image_data), image_mime)] if image_data else [])
+
+
+def _as_bytes(data: bytes | bytearray | memoryview) -> bytes:
+    """Return data as immutable bytes (no copy if it already is)."""
+    return data if type(data) is bytes else bytes(data)
 
 
 def clear_image_state() -> None:
     """Clear image data from state."""
-    _tool_state["image_data"] = None
-    _tool_state["image_mime"] = None
-    _tool_state["images"] = []
+    _request_images.set([])
 
 
 # === Business DNA (Design Style Context) ===
@@ -84,7 +99,7 @@ def get_business_dna() -> Optional[dict]:
     Returns:
         dict with style analysis or None if not analyzed yet
     """
-    return _tool_state.get("business_dna")
+    return _state.business_dna
 
 
 def set_business_dna(dna: dict) -> None:
@@ -97,18 +112,27 @@ def set_business_dna(dna: dict) -> None:
     Args:
         dna: dict containing analyzed design style (colors, typography, etc.)
     """
-    _tool_state["business_dna"] = dna
+    global _dna_version
+    _state.business_dna = dna
+    _dna_version += 1
     print(f"  🧬 [BUSINESS DNA] Stored design DNA with {len(dna)} properties")
 
 
 def clear_business_dna() -> None:
     """Clear the Business DNA from state."""
-    _tool_state["business_dna"] = None
+    global _dna_version
+    _state.business_dna = None
+    _dna_version += 1
+
+
+def get_business_dna_version() -> int:
+    """Get the Business DNA version (changes whenever the DNA is set or cleared)."""
+    return _dna_version
 
 
 def has_business_dna() -> bool:
     """Check if Business DNA has been analyzed."""
-    return _tool_state.get("business_dna") is not None
+    return _state.business_dna is not None
 
 
 # === Component Templates (Header, Navbar, Layout) ===
@@ -127,7 +151,7 @@ def get_component_templates() -> Optional[dict]:
     Returns:
         dict with templates or None if not yet extracted
     """
-    return _tool_state.get("component_templates")
+    return _state.component_templates
 
 
 def set_component_templates(templates: dict) -> None:
@@ -140,19 +164,19 @@ def set_component_templates(templates: dict) -> None:
     Args:
         templates: dict containing header_code, navbar_code, layout_code, etc.
     """
-    _tool_state["component_templates"] = templates
+    _state.component_templates = templates
     template_keys = list(templates.keys()) if templates else []
     print(f"  🎨 [TEMPLATES] Stored {len(template_keys)} component templates: {', '.join(template_keys)}")
 
 
 def clear_component_templates() -> None:
     """Clear the component templates from state."""
-    _tool_state["component_templates"] = None
+    _state.component_templates = None
 
 
 def has_component_templates() -> bool:
     """Check if component templates have been extracted."""
-    templates = _tool_state.get("component_templates")
+    templates = _state.component_templates
     return templates is not None and len(templates) > 0
 
 
@@ -166,7 +190,7 @@ def get_template(template_name: str) -> Optional[str]:
     Returns:
         The template code string or None if not found
     """
-    templates = _tool_state.get("component_templates")
+    templates = _state.component_templates
     if templates:
         return templates.get(template_name)
     return None
@@ -1,8 +1,17 @@
 """URL Scraper Tool using Firecrawl for brand information extraction."""
 
+import copy
 import os
 import json
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+from urllib.parse import urljoin, urlsplit
 
 from langchain_core.tools import tool
 
@@ -12,12 +21,75 @@ try:
 except ImportError:
     FIRECRAWL_AVAILABLE = False
 
-from app.config import FIRECRAWL_API_KEY
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+from app.config import (
+    CRAWL_TIMEOUT,
+    FIRECRAWL_API_KEY,
+    FIRECRAWL_MAX_CONCURRENCY,
+    FIRECRAWL_WARMUP,
+    REDIS_URL,
+    SCRAPE_CACHE_TTL,
+    SCRAPE_MIN_INTERVAL,
+)
 
 
 # Initialize Firecrawl client
 _firecrawl_client = None
 
+# Stay under the Firecrawl plan's rate limit: cap concurrent API calls, space out
+# requests to the same site, and retry 429s with exponential backoff
+FIRECRAWL_MAX_RETRIES = 3
+_firecrawl_slots = threading.BoundedSemaphore(FIRECRAWL_MAX_CONCURRENCY)
+_domain_next_slot: dict[str, float] = {}
+_domain_lock = threading.Lock()
+
+# The HTML patterns run on arbitrary third-party pages - use RE2 (linear time,
+# no backtracking blow-ups) when google-re2 is installed. Flags are inline (?i)
+# because the two engines take compile options differently.
+_html_re = re2 if RE2_AVAILABLE else re
+
+# All brand hints and image sources in one pattern so each page's HTML is
+# scanned once; the named group that matched (m.lastgroup) says which kind it is
+_BRAND_HINTS_RE = _html_re.compile(
+    r'(?i)<img[^>]*(?:logo|brand|icon)[^>]*src=["\'](?P<logo>[^"\']+)["\']'
+    r'|<img[^>]*src=["\'](?P<img>[^"\']+)["\']'
+    r'|font-family\s*:\s*(?P<font>[^;}"\']+)'
+    r'|(?P<rgb>rgba?\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+(?:\s*,\s*[\d.]+)?\s*\))'
+    r'|(?P<hex>#(?:[0-9a-fA-F]{3}){1,2}\b)'
+)
+_BRAND_HINT_LIMITS = {"hex": 10, "rgb": 5, "font": 5, "logo": 5}
+_LOGO_KEYWORDS_RE = re.compile(r'logo|brand|icon', re.IGNORECASE)
+# Company name = page title up to the first "|" or "-" ("Acme - Home | Acme Inc" -> "Acme")
+_TITLE_PREFIX_RE = re.compile(r'[^|\-]*')
+# Rate-limit wording in errors that carry no status code (a bare "429" could be part of a URL or id)
+_RATE_LIMIT_MESSAGE_RE = re.compile(r'too many requests|rate limit exceeded', re.IGNORECASE)
+
+# Successful results keyed by (url, extract_images) for scrapes and (url, "identity")
+# for extract_brand_identity -> (stored_at, result), oldest first
+SCRAPE_CACHE_SIZE = 128
+_scrape_cache: OrderedDict[tuple[str, bool | str], tuple[float, dict]] = OrderedDict()
+_scrape_cache_lock = threading.Lock()
+
+# Shared Redis cache (only when REDIS_URL is set and redis is installed)
+_redis_client = None
+
 
 def _get_client():
     """Get or create the Firecrawl client."""
@@ -32,6 +104,135 @@ def _get_client():
     return _firecrawl_client
 
 
+def _warmup_client() -> None:
+    """Create the Firecrawl client ahead of the first scrape."""
+    try:
+        if _get_client() is not None:
+            print("[OK] Firecrawl client ready")
+    except Exception as e:
+        print(f"[WARNING] Firecrawl warm-up failed: {e}")
+
+
+if FIRECRAWL_WARMUP == "true" and FIRECRAWL_AVAILABLE and FIRECRAWL_API_KEY:
+    threading.Thread(target=_warmup_client, daemon=True).start()
+
+
+def _wait_for_domain(domain: str) -> None:
+    """Block until SCRAPE_MIN_INTERVAL has passed since the last request to this domain."""
+    with _domain_lock:
+        now = time.monotonic()
+        start = max(now, _domain_next_slot.get(domain, 0.0))
+        _domain_next_slot[domain] = start + SCRAPE_MIN_INTERVAL
+    if start > now:
+        time.sleep(start - now)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Whether a Firecrawl error is a 429 (older SDKs only say so in the message)."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return status_code == 429
+    return bool(_RATE_LIMIT_MESSAGE_RE.search(str(error)))
+
+
+def _call_firecrawl(method, *args, urls: list[str], **kwargs):
+    """
+    Call a Firecrawl client method within the rate limits.
+    
+    Waits for every target domain in urls, holds one of the
+    FIRECRAWL_MAX_CONCURRENCY slots for the call, and retries 429 responses
+    with exponential backoff (1s, 2s, 4s plus jitter). Other errors propagate.
+    
+    Both limits apply to our API calls, not to the pages Firecrawl fetches: a
+    batch scrape is one call that keeps its slot until the whole batch returns,
+    and waits once per distinct domain in it. Firecrawl schedules the page
+    fetches inside a batch itself.
+    """
+    domains = list(dict.fromkeys(urlsplit(u).netloc.lower() for u in urls))
+    for attempt in range(FIRECRAWL_MAX_RETRIES + 1):
+        for domain in domains:
+            _wait_for_domain(domain)
+        try:
+            with _firecrawl_slots:
+                return method(*args, **kwargs)
+        except Exception as e:
+            if attempt == FIRECRAWL_MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            delay = 2 ** attempt + random.random()
+            print(f"  ⏳ [SCRAPE] Firecrawl rate limit hit, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _get_redis():
+    """Get or create the Redis client used as a cross-worker result cache."""
+    global _redis_client
+    
+    if not REDIS_AVAILABLE or not REDIS_URL:
+        return None
+    
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=1)
+    
+    return _redis_client
+
+
+def _redis_key(kind: str, *parts) -> str:
+    """Build a Redis key from a result kind and the options that produced it."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f"brand:{kind}:{digest}"
+
+
+def _redis_get(key: str) -> Optional[dict]:
+    """Read a cached result from Redis (None on miss, or if Redis is unavailable)."""
+    client = _get_redis()
+    if client is None:
+        return None
+    try:
+        value = client.get(key)
+        return json.loads(value) if value else None
+    except Exception as e:
+        print(f"  ⚠️ [REDIS] Cache read failed: {e}")
+        return None
+
+
+def _redis_set(key: str, result: dict) -> None:
+    """Store a result in Redis for SCRAPE_CACHE_TTL seconds (no-op if Redis is unavailable)."""
+    client = _get_redis()
+    if client is None:
+        return
+    try:
+        client.setex(key, SCRAPE_CACHE_TTL, json.dumps(result))
+    except Exception as e:
+        print(f"  ⚠️ [REDIS] Cache write failed: {e}")
+
+
+def _get_cached_scrape(key: tuple[str, bool | str]) -> Optional[dict]:
+    """Return a copy of the cached scrape result if it is younger than SCRAPE_CACHE_TTL."""
+    with _scrape_cache_lock:
+        entry = _scrape_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > SCRAPE_CACHE_TTL:
+            del _scrape_cache[key]
+            return None
+        _scrape_cache.move_to_end(key)
+    # Callers get their own copy, so editing a result can't change what later hits see
+    return copy.deepcopy(result)
+
+
+def _store_cached_scrape(key: tuple[str, bool | str], result: dict) -> None:
+    """Cache a copy of a successful scrape result, evicting the least recently used beyond the limit."""
+    result = copy.deepcopy(result)
+    with _scrape_cache_lock:
+        _scrape_cache[key] = (time.monotonic(), result)
+        _scrape_cache.move_to_end(key)
+        if len(_scrape_cache) > SCRAPE_CACHE_SIZE:
+            _scrape_cache.popitem(last=False)
+
+
 @tool
 def scrape_brand_from_url(
     url: str,
@@ -46,7 +247,8 @@ def scrape_brand_from_url(
     
     Args:
         url: The website URL to scrape (e.g., "https://example.com")
-        extract_images: Whether to extract image URLs from the page
+        extract_images: Whether to extract image URLs from the page. When False
+            only markdown is fetched (no HTML), and brand hints come from the markdown
     
     Returns:
         dict containing:
@@ -57,6 +259,20 @@ def scrape_brand_from_url(
         - metadata: Additional metadata
         - brand_hints: Extracted brand information
     """
+    # Same page scraped recently? Reuse it instead of another Firecrawl round-trip
+    cache_key = (url, extract_images)
+    cached = _get_cached_scrape(cache_key)
+    if cached is not None:
+        print(f"  🌐 [SCRAPE] Reusing cached result for {url}")
+        return cached
+    
+    redis_key = _redis_key("scrape", url, extract_images)
+    cached = _redis_get(redis_key)
+    if cached is not None:
+        print(f"  🌐 [SCRAPE] Reusing shared cached result for {url}")
+        _store_cached_scrape(cache_key, cached)
+        return cached
+    
     client = _get_client()
     
     if not client:
@@ -66,39 +282,19 @@ def scrape_brand_from_url(
     
     try:
         # Scrape the URL (firecrawl-py v2 uses .scrape() and returns Document object)
-        result = client.scrape(
+        result = _call_firecrawl(
+            client.scrape,
             url,
-            formats=["markdown", "html"],
+            urls=[url],
+            formats=_scrape_formats(extract_images),
             include_tags=["img", "link", "meta", "style"],
             only_main_content=False,
         )
         
-        # Convert Document object to dict-like access
-        html_content = getattr(result, 'html', '') or ''
-        markdown_content = getattr(result, 'markdown', '') or ''
-        metadata = getattr(result, 'metadata_dict', {}) if hasattr(result, 'metadata_dict') else {}
-        if not metadata and hasattr(result, 'metadata'):
-            md = result.metadata
-            metadata = md.model_dump(exclude_none=True) if hasattr(md, 'model_dump') else (md or {})
-        
-        # Extract brand-relevant information
-        brand_hints = _extract_brand_hints({"html": html_content, "metadata": metadata})
-        
-        # Get images if requested
-        images = []
-        if extract_images and html_content:
-            images = _extract_image_urls(html_content, url)
-        
-        return {
-            "success": True,
-            "url": url,
-            "title": metadata.get("title", ""),
-            "description": metadata.get("description", ""),
-            "content": markdown_content[:5000],  # Limit content size
-            "images": images[:20],  # Limit to 20 images
-            "metadata": metadata,
-            "brand_hints": brand_hints,
-        }
+        scrape_result = _document_to_scrape_result(result, url, extract_images)
+        _store_cached_scrape(cache_key, scrape_result)
+        _redis_set(redis_key, scrape_result)
+        return scrape_result
         
     except Exception as e:
         return {
@@ -107,8 +303,188 @@ def scrape_brand_from_url(
         }
 
 
-def _extract_brand_hints(result: dict) -> dict:
-    """Extract brand-relevant hints from scraped content."""
+def _scrape_formats(extract_images: bool) -> list[str]:
+    """Firecrawl formats to request; HTML is only worth its payload when we mine it for images."""
+    return ["markdown", "html"] if extract_images else ["markdown"]
+
+
+def _document_metadata(document) -> dict:
+    """Get a Firecrawl Document's metadata as a plain dict."""
+    metadata = getattr(document, 'metadata_dict', {}) if hasattr(document, 'metadata_dict') else {}
+    if not metadata and hasattr(document, 'metadata'):
+        md = document.metadata
+        metadata = md.model_dump(exclude_none=True) if hasattr(md, 'model_dump') else (md or {})
+    return metadata
+
+
+def _document_to_scrape_result(document, url: str, extract_images: bool) -> dict:
+    """Build the scrape_brand_from_url result for one scraped Firecrawl Document."""
+    # Convert Document object to dict-like access
+    html_content = getattr(document, 'html', '') or ''
+    markdown_content = getattr(document, 'markdown', '') or ''
+    metadata = _document_metadata(document)
+    
+    # Extract brand-relevant information (markdown-only scrapes still carry some colors/fonts),
+    # collecting the page's <img> sources in the same pass
+    img_srcs = []
+    brand_hints = _extract_brand_hints(
+        {"html": html_content, "markdown": markdown_content, "metadata": metadata}, img_srcs
+    )
+    
+    # Get images if requested
+    images = []
+    if extract_images and html_content:
+        images = _resolve_image_urls(img_srcs, url)
+    
+    return {
+        "success": True,
+        "url": url,
+        "title": metadata.get("title", ""),
+        "description": metadata.get("description", ""),
+        "content": markdown_content[:5000],  # Limit content size
+        "images": images[:20],  # Limit to 20 images
+        "metadata": metadata,
+        "brand_hints": brand_hints,
+    }
+
+
+@tool
+def scrape_brands_batch(
+    urls: list[str],
+    extract_images: bool = True,
+) -> dict:
+    """
+    Scrape brand information from several website URLs in one Firecrawl batch.
+    
+    Use this instead of calling scrape_brand_from_url repeatedly when you have
+    multiple related URLs (e.g. a brand's homepage, about and product pages).
+    
+    Args:
+        urls: The website URLs to scrape
+        extract_images: Whether to extract image URLs from the pages. When False
+            only markdown is fetched (no HTML), and brand hints come from the markdown
+    
+    Returns:
+        dict with "results": one scrape_brand_from_url-style result per URL,
+        in the same order as the input
+    """
+    urls = list(dict.fromkeys(urls))
+    results = {}
+    
+    # Serve what we can from the caches; only the rest goes to Firecrawl
+    for url in urls:
+        cache_key = (url, extract_images)
+        cached = _get_cached_scrape(cache_key)
+        if cached is None:
+            cached = _redis_get(_redis_key("scrape", url, extract_images))
+            if cached is not None:
+                _store_cached_scrape(cache_key, cached)
+        if cached is not None:
+            results[url] = cached
+    missing = [url for url in urls if url not in results]
+    
+    if missing:
+        client = _get_client()
+        
+        if not client:
+            return {
+                "error": "Firecrawl not available. Please install firecrawl-py and set FIRECRAWL_API_KEY.",
+            }
+        
+        try:
+            # One batch job for all URLs (firecrawl-py v2 .batch_scrape() returns a BatchScrapeJob)
+            batch_result = _call_firecrawl(
+                client.batch_scrape,
+                missing,
+                urls=missing,
+                formats=_scrape_formats(extract_images),
+                include_tags=["img", "link", "meta", "style"],
+                only_main_content=False,
+                poll_interval=2,
+            )
+            documents = getattr(batch_result, 'data', []) or []
+        except Exception as e:
+            return {
+                "error": f"Failed to batch scrape URLs: {str(e)}",
+                "urls": urls,
+            }
+        
+        # Match documents back to their URLs (fall back to batch order)
+        by_url = {}
+        for document in documents:
+            metadata = _document_metadata(document)
+            source_url = metadata.get("sourceURL") or metadata.get("source_url") or metadata.get("url")
+            if source_url in missing:
+                by_url[source_url] = document
+        matched = set(by_url)
+        matched_ids = {id(doc) for doc in by_url.values()}
+        unmatched = [d for d in documents if id(d) not in matched_ids]
+        for url in missing:
+            if url not in by_url and unmatched:
+                by_url[url] = unmatched.pop(0)
+        
+        for url in missing:
+            document = by_url.get(url)
+            if document is None:
+                results[url] = {"error": "No content returned for this URL", "url": url}
+                continue
+            scrape_result = _document_to_scrape_result(document, url, extract_images)
+            # A document placed by batch order may belong to another URL - return it,
+            # but only cache documents whose own source URL says where they came from
+            if url in matched:
+                _store_cached_scrape((url, extract_images), scrape_result)
+                _redis_set(_redis_key("scrape", url, extract_images), scrape_result)
+            results[url] = scrape_result
+    
+    return {
+        "success": any(result.get("success") for result in results.values()),
+        "count": len(urls),
+        "results": [results[url] for url in urls],
+    }
+
+
+def _scan_brand_hints(text: str, limits: dict[str, int], collect_images: bool = False) -> dict[str, list]:
+    """
+    Collect colors (CSS variables and inline styles), font families and logo
+    candidates (images with logo/brand/icon in the tag) in a single regex pass.
+    
+    Keeps the first unique values of each kind in page order, capped by limits
+    (kinds not in limits are ignored), and stops as soon as every bucket is full.
+    With collect_images, every <img> src (logo or not) is also returned under
+    "img" in page order - that needs the whole page, so the scan runs to the end.
+    """
+    found = {kind: {} for kind in limits}  # dicts as ordered sets
+    open_buckets = len(found)
+    img_srcs = {}
+    for match in _BRAND_HINTS_RE.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if collect_images and kind in ("logo", "img"):
+            img_srcs[value] = None
+        bucket = found.get(kind)
+        if bucket is not None and len(bucket) < limits[kind]:
+            bucket[value] = None
+            if len(bucket) == limits[kind]:
+                open_buckets -= 1
+                if not open_buckets and not collect_images:
+                    break
+    
+    hints = {kind: list(found.get(kind, ())) for kind in ("hex", "rgb", "font", "logo")}
+    hints["img"] = list(img_srcs)
+    return hints
+
+
+def _extract_brand_hints(result: dict, image_srcs: Optional[list] = None) -> dict:
+    """
+    Extract brand-relevant hints from scraped content.
+    
+    Uses result["html"] when present; markdown-only scrapes (no HTML) are
+    scanned from result["markdown"] with the plain regex pass instead, since
+    markdown has no <style> blocks or style attributes for the parser to find.
+    
+    If image_srcs is given, every <img> src found while scanning is appended
+    to it, so callers that also want the page's images don't re-scan the HTML.
+    """
     hints = {
         "colors": [],
         "fonts": [],
@@ -118,24 +494,37 @@ def _extract_brand_hints(result: dict) -> dict:
     
     html = result.get("html", "")
     
-    # Extract colors from CSS variables and inline styles
-    import re
-    
-    # Find hex colors
-    hex_colors = re.findall(r'#(?:[0-9a-fA-F]{3}){1,2}\b', html)
-    hints["colors"] = list(set(hex_colors))[:10]
-    
-    # Find RGB/RGBA colors
-    rgb_colors = re.findall(r'rgba?\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+(?:\s*,\s*[\d.]+)?\s*\)', html)
-    hints["colors"].extend(list(set(rgb_colors))[:5])
+    if SELECTOLAX_AVAILABLE and html:
+        # Parse once, then scan only the CSS (<style> blocks and style attributes) and
+        # color meta tags (theme-color, msapplication-TileColor, ...) for colors/fonts,
+        # and take images and logo candidates from the parsed <img> tags
+        tree = LexborHTMLParser(html)
+        css_text = "\n".join(
+            [node.text() for node in tree.css("style")]
+            + [node.attributes.get("style") or "" for node in tree.css("[style]")]
+            + [
+                node.attributes.get("content") or "" for node in tree.css("meta[content]")
+                if "color" in (node.attributes.get("name") or "").lower()
+            ]
+        )
+        found = _scan_brand_hints(css_text, {k: v for k, v in _BRAND_HINT_LIMITS.items() if k != "logo"})
+        img_attrs = [node.attributes for node in tree.css("img[src]")]
+        found["img"] = list(dict.fromkeys(attrs["src"] for attrs in img_attrs if attrs.get("src")))
+        found["logo"] = list(dict.fromkeys(
+            attrs["src"] for attrs in img_attrs
+            if attrs.get("src") and _LOGO_KEYWORDS_RE.search(" ".join(f"{k}={v}" for k, v in attrs.items()))
+        ))[:_BRAND_HINT_LIMITS["logo"]]
+    else:
+        found = _scan_brand_hints(
+            html or result.get("markdown", ""), _BRAND_HINT_LIMITS, collect_images=image_srcs is not None
+        )
     
-    # Find font families
-    font_families = re.findall(r'font-family\s*:\s*([^;}"\']+)', html)
-    hints["fonts"] = list(set(font_families))[:5]
+    if image_srcs is not None:
+        image_srcs.extend(found["img"])
     
-    # Find logo candidates (images with logo in name/alt)
-    logo_imgs = re.findall(r'<img[^>]*(?:logo|brand|icon)[^>]*src=["\']([^"\']+)["\']', html, re.IGNORECASE)
-    hints["logo_candidates"] = logo_imgs[:5]
+    hints["colors"] = found["hex"] + found["rgb"]
+    hints["fonts"] = found["font"]
+    hints["logo_candidates"] = found["logo"]
     
     # Extract style keywords from meta tags and content
     metadata = result.get("metadata", {})
@@ -145,26 +534,38 @@ def _extract_brand_hints(result: dict) -> dict:
     return hints
 
 
-def _extract_image_urls(html: str, base_url: str) -> list:
-    """Extract image URLs from HTML."""
-    import re
-    from urllib.parse import urljoin
-    
-    # Find all img src attributes
-    img_srcs = re.findall(r'<img[^>]*src=["\']([^"\']+)["\']', html, re.IGNORECASE)
-    
-    # Convert relative URLs to absolute
+def _resolve_image_urls(img_srcs: list, base_url: str) -> list:
+    """Turn <img> src values from a page into absolute image URLs."""
+    # Convert relative URLs to absolute; only unusual relative paths need urljoin
+    base = urlsplit(base_url)
+    scheme = base.scheme or "https"
+    origin = f"{scheme}://{base.netloc}"
     absolute_urls = []
     for src in img_srcs:
         if src.startswith("data:"):
             continue  # Skip data URLs
         if src.startswith("//"):
-            src = "https:" + src
+            src = f"{scheme}:{src}"
+        elif src.startswith("/") and "/." not in src:
+            src = origin + src
         elif not src.startswith("http"):
             src = urljoin(base_url, src)
         absolute_urls.append(src)
     
-    return list(set(absolute_urls))
+    return list(dict.fromkeys(absolute_urls))
+
+
+def _process_page(page) -> tuple[dict, dict]:
+    """Extract brand hints and a url/title summary from one crawled Document."""
+    html_content = getattr(page, 'html', '') or ''
+    metadata = _document_metadata(page)
+    
+    hints = _extract_brand_hints({"html": html_content, "metadata": metadata})
+    page_summary = {
+        "url": metadata.get("sourceURL", metadata.get("source_url", "")),
+        "title": metadata.get("title", ""),
+    }
+    return hints, page_summary
 
 
 @tool
@@ -185,6 +586,12 @@ def crawl_website_for_brand(
     Returns:
         dict with aggregated brand information from multiple pages
     """
+    redis_key = _redis_key("crawl", url, max_pages)
+    cached = _redis_get(redis_key)
+    if cached is not None:
+        print(f"  🌐 [CRAWL] Reusing shared cached result for {url}")
+        return cached
+    
     client = _get_client()
     
     if not client:
@@ -193,50 +600,74 @@ def crawl_website_for_brand(
         }
     
     try:
-        # Start a crawl (firecrawl-py v2 uses .crawl() and returns CrawlJob object)
-        crawl_result = client.crawl(
+        # Start the crawl job and poll it ourselves (firecrawl-py v2 .start_crawl() /
+        # .get_crawl_status()), so pages are processed while the crawl is still
+        # running and each page's HTML can be dropped once its hints are taken
+        job = _call_firecrawl(
+            client.start_crawl,
             url,
+            urls=[url],
             limit=max_pages,
             scrape_options={"formats": ["markdown", "html"]},
-            poll_interval=2,
         )
         
-        # Get documents from CrawlJob - it has a 'data' attribute with Document objects
-        documents = getattr(crawl_result, 'data', []) or []
-        
-        # Aggregate brand information
-        all_colors = set()
-        all_fonts = set()
+        # Aggregate brand information, ranked by how many pages use each color/font
+        color_counts = Counter()
+        font_counts = Counter()
         page_summaries = []
+        pages_seen = 0
+        deadline = time.monotonic() + CRAWL_TIMEOUT
         
-        for page in documents:
-            # Handle Document objects
-            html_content = getattr(page, 'html', '') or ''
-            metadata = {}
-            if hasattr(page, 'metadata_dict'):
-                metadata = page.metadata_dict
-            elif hasattr(page, 'metadata') and page.metadata:
-                md = page.metadata
-                metadata = md.model_dump(exclude_none=True) if hasattr(md, 'model_dump') else {}
-            
-            hints = _extract_brand_hints({"html": html_content, "metadata": metadata})
-            all_colors.update(hints.get("colors", []))
-            all_fonts.update(hints.get("fonts", []))
-            
-            page_summaries.append({
-                "url": metadata.get("sourceURL", metadata.get("source_url", "")),
-                "title": metadata.get("title", ""),
-            })
+        with ThreadPoolExecutor(max_workers=min(8, max(1, max_pages))) as executor:
+            while True:
+                crawl_job = _call_firecrawl(client.get_crawl_status, job.id, urls=[])
+                
+                # Status data is cumulative - only handle pages we haven't seen yet
+                new_pages = (crawl_job.data or [])[pages_seen:]
+                pages_seen += len(new_pages)
+                
+                # Extract hints from the new pages in parallel (page order is preserved)
+                for hints, page_summary in executor.map(_process_page, new_pages):
+                    color_counts.update(hints.get("colors", []))
+                    font_counts.update(hints.get("fonts", []))
+                    page_summaries.append(page_summary)
+                
+                status = crawl_job.status
+                if status in ("completed", "failed", "cancelled"):
+                    break
+                if time.monotonic() >= deadline:
+                    try:
+                        client.cancel_crawl(job.id)
+                    except Exception as e:
+                        print(f"  ⚠️ [CRAWL] Could not cancel timed-out crawl {job.id}: {e}")
+                    status = "timeout"
+                    break
+                time.sleep(2)
         
-        return {
+        if status != "completed":
+            return {
+                "success": False,
+                "error": (
+                    f"Crawl did not finish within {CRAWL_TIMEOUT:.0f}s" if status == "timeout"
+                    else f"Crawl {status}"
+                ),
+                "status": status,
+                "url": url,
+                "pages_crawled": pages_seen,
+                "pages": page_summaries,
+            }
+        
+        crawl_summary = {
             "success": True,
             "url": url,
-            "pages_crawled": len(documents),
-            "aggregated_colors": list(all_colors)[:15],
-            "aggregated_fonts": list(all_fonts)[:10],
+            "pages_crawled": pages_seen,
+            "aggregated_colors": [color for color, _ in color_counts.most_common(15)],
+            "aggregated_fonts": [font for font, _ in font_counts.most_common(10)],
             "pages": page_summaries,
-            "brand_summary": f"Crawled {len(documents)} pages from {url}",
+            "brand_summary": f"Crawled {pages_seen} pages from {url}",
         }
+        _redis_set(redis_key, crawl_summary)
+        return crawl_summary
         
     except Exception as e:
         return {
@@ -265,8 +696,15 @@ def extract_brand_identity(url: str) -> dict:
         - tone: Brand voice/tone based on content
         - style_guide: Generated style guide summary
     """
-    # First scrape the main page
-    scrape_result = scrape_brand_from_url.invoke({"url": url, "extract_images": True})
+    # Identity only depends on the URL - reuse a recent one as-is
+    cache_key = (url, "identity")
+    cached = _get_cached_scrape(cache_key)
+    if cached is not None:
+        print(f"  🌐 [SCRAPE] Reusing cached brand identity for {url}")
+        return cached
+    
+    # First scrape the main page (call the plain function - no need for another tool run)
+    scrape_result = scrape_brand_from_url.func(url, extract_images=True)
     
     if "error" in scrape_result:
         return scrape_result
@@ -275,7 +713,7 @@ def extract_brand_identity(url: str) -> dict:
     brand_identity = {
         "success": True,
         "url": url,
-        "company_name": scrape_result.get("title", "").split("|")[0].split("-")[0].strip(),
+        "company_name": _TITLE_PREFIX_RE.match(scrape_result.get("title", "")).group().strip(),
         "tagline": scrape_result.get("description", ""),
         "colors": {
             "detected": scrape_result.get("brand_hints", {}).get("colors", []),
@@ -293,6 +731,7 @@ def extract_brand_identity(url: str) -> dict:
         "style_guide_prompt": _generate_style_guide_prompt(scrape_result),
     }
     
+    _store_cached_scrape(cache_key, brand_identity)
     return brand_identity
 
 
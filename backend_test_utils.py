@@ -0,0 +1,77 @@
+"""Helpers shared by the LangGraph backend test scripts."""
+
+import json
+import os
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Assistant IDs created on earlier runs live in JSON files here ({cache_key: assistant_id})
+ASSISTANT_CACHE_DIR = os.path.expanduser("~/.cache/olympiccoders")
+
+
+def dumps(obj, indent: bool = False) -> str:
+    """Serialize to JSON text (orjson when installed, else the stdlib)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def loads(data):
+    """Parse JSON text or a response body (orjson when installed, else the stdlib)."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def load_assistant_ids(cache_path: str) -> dict:
+    """Read the cached assistant IDs (empty if there is no usable cache file)."""
+    try:
+        with open(cache_path, "rb") as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_assistant_id(cache_path: str, cache_key: str, assistant_id: str) -> None:
+    """Remember the assistant created on this server for the next run."""
+    assistant_ids = load_assistant_ids(cache_path)
+    assistant_ids[cache_key] = assistant_id
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(dumps(assistant_ids))
+        os.replace(tmp_path, cache_path)  # Atomic - readers never see a partial file
+    except OSError:
+        pass  # Caching is best-effort
+
+
+def _assistant_id(assistant) -> Optional[str]:
+    return assistant.get("assistant_id") if isinstance(assistant, dict) else getattr(assistant, "assistant_id", None)
+
+
+async def get_or_create_assistant(
+    client,
+    cache_path: str,
+    cache_key: str,
+    graph_id: str,
+    name: str,
+) -> tuple[dict, bool]:
+    """Reuse the assistant from an earlier run if the server still has it, else create one.
+
+    client is a langgraph_sdk async client. Returns (assistant, reused).
+    """
+    cached_id = load_assistant_ids(cache_path).get(cache_key)
+    if cached_id:
+        try:
+            return await client.assistants.get(cached_id), True
+        except Exception:
+            pass  # Gone (server restarted) - create a new one
+
+    assistant = await client.assistants.create(graph_id=graph_id, name=name)
+    assistant_id = _assistant_id(assistant)
+    if assistant_id:
+        save_assistant_id(cache_path, cache_key, assistant_id)
+    return assistant, False
@@ -1,23 +1,92 @@
 #!/usr/bin/env python3
-"""Simple test script to test the LangGraph backend with a 'hi' message."""
+"""Simple test script to test the LangGraph backend with a 'hi' message.
 
-import requests
-import json
+Pass several messages on the command line to run them concurrently.
+"""
+
+import asyncio
+import os
 import sys
+import time
 from typing import Optional
 
+import httpx
+
+from backend_test_utils import ASSISTANT_CACHE_DIR, dumps, loads, load_assistant_ids, save_assistant_id
+
+try:
+    import h2  # noqa: F401 - lets httpx negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # Default LangGraph dev server URL
 DEFAULT_URL = "http://127.0.0.1:2024"
 GRAPH_ID = "agent"
 
+# Assistant IDs created on earlier runs, per server URL (JSON: {api_url: assistant_id})
+ASSISTANT_CACHE_PATH = os.path.join(ASSISTANT_CACHE_DIR, "assistant_id")
+
+# Transient failures (server restarting, proxy hiccups) are retried before giving up
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.2  # Seconds, doubled after each attempt
+RETRY_STATUSES = {502, 503, 504}
+# Only requests that are safe to send twice get status retries: a 5xx from a proxy can
+# arrive after the server already created the assistant/thread/run. The stateless
+# top-level /runs/wait leaves no thread behind, so repeating it only repeats the answer;
+# /threads/{id}/runs/wait appends to the thread and is not retried.
+RETRY_METHODS = {"GET", "HEAD"}
+RETRY_POST_PATHS = {"/runs/wait"}
+
+
+def _is_idempotent(request: httpx.Request) -> bool:
+    """Whether a request can be repeated without creating anything twice."""
+    if request.method in RETRY_METHODS:
+        return True
+    return request.method == "POST" and request.url.path in RETRY_POST_PATHS
+
+
+class _RetryTransport(httpx.HTTPTransport):
+    """HTTPTransport that also retries 502/503/504 responses with exponential backoff.
+    
+    Only idempotent requests (see RETRY_METHODS / RETRY_POST_PATHS) are retried on
+    a status code. Failed connection attempts - where nothing was sent - are retried
+    for every request by HTTPTransport itself (retries=...).
+    """
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not _is_idempotent(request):
+            return super().handle_request(request)
+        for attempt in range(MAX_RETRIES):
+            response = super().handle_request(request)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            response.close()
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+        return super().handle_request(request)
+
+
+# One keep-alive client for all requests to the server (no handshake per call;
+# HTTP/2 multiplexing when h2 is installed and the server supports it)
+CLIENT = httpx.Client(
+    headers={"Content-Type": "application/json"},
+    transport=_RetryTransport(
+        retries=MAX_RETRIES,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+    ),
+)
 
-def test_langgraph_backend(message: str = "hi", api_url: Optional[str] = None) -> None:
+
+def test_langgraph_backend(message: str = "hi", api_url: Optional[str] = None, stateful: bool = False) -> None:
     """
     Test the LangGraph backend by sending a message.
     
     Args:
         message: The message to send (default: "hi")
         api_url: The LangGraph API URL (default: http://127.0.0.1:2024)
+        stateful: Create a thread, assistant and run step by step instead of
+            one stateless /runs/wait call (default: False)
     """
     if api_url is None:
         api_url = DEFAULT_URL
@@ -26,17 +95,20 @@ def test_langgraph_backend(message: str = "hi", api_url: Optional[str] = None) -
     print(f"📤 Sending message: '{message}'")
     print("-" * 50)
     
+    if not stateful:
+        _run_stateless(message, api_url)
+        return
+    
     # Create a thread
     try:
         print("1️⃣ Creating thread...")
-        thread_response = requests.post(
+        thread_response = CLIENT.post(
             f"{api_url}/threads",
-            headers={"Content-Type": "application/json"},
             json={},  # Empty JSON body
             timeout=10
         )
         thread_response.raise_for_status()
-        thread_data = thread_response.json()
+        thread_data = loads(thread_response.content)
         thread_id = thread_data.get("thread_id")
         
         if not thread_id:
@@ -46,52 +118,55 @@ def test_langgraph_backend(message: str = "hi", api_url: Optional[str] = None) -
         
         print(f"✅ Thread created: {thread_id}")
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print(f"❌ Connection error: Could not connect to {api_url}")
         print("💡 Make sure the LangGraph server is running:")
         print("   langgraph dev")
         sys.exit(1)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error creating thread: {e}")
-        if hasattr(e.response, 'text'):
+        if isinstance(e, httpx.HTTPStatusError):
             print(f"Response: {e.response.text}")
         sys.exit(1)
     
-    # Create an assistant (or use existing)
+    # Create an assistant (or reuse the one from an earlier run)
     try:
         print("\n2️⃣ Creating/getting assistant...")
-        assistant_response = requests.post(
-            f"{api_url}/assistants",
-            headers={"Content-Type": "application/json"},
-            json={
-                "graph_id": GRAPH_ID,
-                "name": "Test Assistant"
-            },
-            timeout=10
-        )
-        assistant_response.raise_for_status()
-        assistant_data = assistant_response.json()
-        assistant_id = assistant_data.get("assistant_id")
-        
-        if not assistant_id:
-            print("❌ Failed to create assistant: No assistant_id in response")
-            print(f"Response: {assistant_data}")
-            return
-        
-        print(f"✅ Assistant created: {assistant_id}")
+        assistant_id = load_assistant_ids(ASSISTANT_CACHE_PATH).get(api_url)
+        if assistant_id and CLIENT.get(f"{api_url}/assistants/{assistant_id}", timeout=10).is_success:
+            print(f"✅ Reusing assistant: {assistant_id}")
+        else:
+            assistant_response = CLIENT.post(
+                f"{api_url}/assistants",
+                json={
+                    "graph_id": GRAPH_ID,
+                    "name": "Test Assistant"
+                },
+                timeout=10
+            )
+            assistant_response.raise_for_status()
+            assistant_data = loads(assistant_response.content)
+            assistant_id = assistant_data.get("assistant_id")
+            
+            if not assistant_id:
+                print("❌ Failed to create assistant: No assistant_id in response")
+                print(f"Response: {assistant_data}")
+                return
+            
+            save_assistant_id(ASSISTANT_CACHE_PATH, api_url, assistant_id)
+            print(f"✅ Assistant created: {assistant_id}")
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error creating assistant: {e}")
-        if hasattr(e.response, 'text'):
+        if isinstance(e, httpx.HTTPStatusError):
             print(f"Response: {e.response.text}")
         sys.exit(1)
     
     # Send a message
     try:
         print(f"\n3️⃣ Sending message '{message}'...")
-        run_response = requests.post(
+        run_response = CLIENT.post(
             f"{api_url}/threads/{thread_id}/runs",
-            headers={"Content-Type": "application/json"},
             json={
                 "assistant_id": assistant_id,
                 "input": {
@@ -106,7 +181,7 @@ def test_langgraph_backend(message: str = "hi", api_url: Optional[str] = None) -
             timeout=60  # Longer timeout for AI response
         )
         run_response.raise_for_status()
-        run_data = run_response.json()
+        run_data = loads(run_response.content)
         run_id = run_data.get("run_id")
         
         if not run_id:
@@ -116,136 +191,266 @@ def test_langgraph_backend(message: str = "hi", api_url: Optional[str] = None) -
         
         print(f"✅ Run created: {run_id}")
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error creating run: {e}")
-        if hasattr(e.response, 'text'):
+        if isinstance(e, httpx.HTTPStatusError):
             print(f"Response: {e.response.text}")
         sys.exit(1)
     
     # Wait for the run to complete and get the result
     try:
         print("\n4️⃣ Waiting for response...")
-        import time
         
         max_wait = 60  # Maximum wait time in seconds
-        start_time = time.time()
-        check_interval = 1  # Check every second
         
-        while time.time() - start_time < max_wait:
-            status_response = requests.get(
-                f"{api_url}/threads/{thread_id}/runs/{run_id}",
-                timeout=10
+        # join blocks server-side until the run is finished - no status polling -
+        # and returns the thread's final values, so no separate state fetch is needed
+        try:
+            join_response = CLIENT.get(
+                f"{api_url}/threads/{thread_id}/runs/{run_id}/join",
+                timeout=httpx.Timeout(max_wait, connect=10)
             )
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            
-            status = status_data.get("status")
-            print(f"   Status: {status}")
-            
-            if status in ["success", "error", "cancelled"]:
-                break
+            join_response.raise_for_status()
+            print("   Run finished")
+            state_data, raw = {"values": loads(join_response.content)}, join_response.content
+        except httpx.TimeoutException:
+            print(f"   ⚠️ Run still going after {max_wait}s - showing current state")
             
-            time.sleep(check_interval)
-        
-        # Get the final state
-        print("\n5️⃣ Getting final response...")
-        state_response = requests.get(
-            f"{api_url}/threads/{thread_id}/state",
-            timeout=10
-        )
-        state_response.raise_for_status()
-        state_data = state_response.json()
+            # Get the current state (the full checkpoint: values, next, tasks, metadata)
+            print("\n5️⃣ Getting current response...")
+            state_response = CLIENT.get(
+                f"{api_url}/threads/{thread_id}/state",
+                timeout=10
+            )
+            state_response.raise_for_status()
+            state_data, raw = loads(state_response.content), state_response.content
         
-        # Extract messages from state
-        values = state_data.get("values", {})
-        messages = values.get("messages", [])
+        _print_state(state_data, raw)
         
-        print("\n" + "=" * 50)
-        print("📥 RESPONSE:")
-        print("=" * 50)
+    except httpx.HTTPError as e:
+        print(f"❌ Error getting response: {e}")
+        if isinstance(e, httpx.HTTPStatusError):
+            print(f"Response: {e.response.text}")
+        sys.exit(1)
+
+
+def _run_stateless(message: str, api_url: str) -> None:
+    """Send the message as a stateless run - one request that returns the final state."""
+    try:
+        print(f"1️⃣ Sending message '{message}' (stateless run)...")
+        run_response = CLIENT.post(
+            f"{api_url}/runs/wait",
+            json={
+                "assistant_id": GRAPH_ID,
+                "input": {
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": message
+                        }
+                    ]
+                }
+            },
+            timeout=120  # Blocks until the AI response is complete
+        )
+        run_response.raise_for_status()
+        values = loads(run_response.content)
         
-        if messages:
-            # Print all messages for debugging
-            print(f"\nFound {len(messages)} message(s):")
-            for i, msg in enumerate(messages):
-                msg_type = msg.get("type", msg.get("role", "unknown"))
-                print(f"\n  Message {i+1} ({msg_type}):")
-                
-                content = msg.get("content", "")
-                if isinstance(content, str):
-                    if content:
-                        print(f"    {content}")
+    except httpx.ConnectError:
+        print(f"❌ Connection error: Could not connect to {api_url}")
+        print("💡 Make sure the LangGraph server is running:")
+        print("   langgraph dev")
+        sys.exit(1)
+    except httpx.HTTPError as e:
+        print(f"❌ Error running message: {e}")
+        if isinstance(e, httpx.HTTPStatusError):
+            print(f"Response: {e.response.text}")
+        sys.exit(1)
+    
+    _print_state({"values": values}, run_response.content)
+
+
+def _print_state(state_data: dict, raw: bytes) -> None:
+    """Print the messages (and the last AI reply) from a run's final state.
+    
+    raw is the response body state_data was parsed from; it is shown as-is
+    when there are no messages, instead of re-serializing the whole state.
+    """
+    # Extract messages from state
+    values = state_data.get("values", {})
+    messages = values.get("messages", [])
+    
+    print("\n" + "=" * 50)
+    print("📥 RESPONSE:")
+    print("=" * 50)
+    
+    if messages:
+        # Print all messages for debugging
+        print(f"\nFound {len(messages)} message(s):")
+        for i, msg in enumerate(messages):
+            msg_type = msg.get("type", msg.get("role", "unknown"))
+            print(f"\n  Message {i+1} ({msg_type}):")
+    
+            content = msg.get("content", "")
+            if isinstance(content, str):
+                if content:
+                    print(f"    {content}")
+                else:
+                    print("    [Empty content]")
+            elif isinstance(content, list):
+                # Handle multi-part content
+                for j, part in enumerate(content):
+                    if isinstance(part, dict):
+                        if part.get("type") == "text":
+                            text = part.get("text", "")
+                            if text:
+                                print(f"    Part {j+1} (text): {text}")
+                        elif part.get("type") == "image_url":
+                            print(f"    Part {j+1}: [Image included]")
+                        else:
+                            print(f"    Part {j+1}: {dumps(part, indent=True)}")
                     else:
-                        print("    [Empty content]")
+                        print(f"    Part {j+1}: {part}")
+            elif content:
+                print(f"    {dumps(content, indent=True)}")
+            else:
+                print("    [No content]")
+    
+        # Get the last AI message specifically
+        print("\n" + "-" * 50)
+        print("🤖 AI Response:")
+        print("-" * 50)
+        ai_response_found = False
+        for msg in reversed(messages):
+            if msg.get("type") == "ai" or msg.get("role") == "assistant":
+                ai_response_found = True
+                content = msg.get("content", "")
+                if isinstance(content, str) and content:
+                    print(content)
                 elif isinstance(content, list):
                     # Handle multi-part content
-                    for j, part in enumerate(content):
+                    for part in content:
                         if isinstance(part, dict):
                             if part.get("type") == "text":
                                 text = part.get("text", "")
                                 if text:
-                                    print(f"    Part {j+1} (text): {text}")
+                                    print(text)
                             elif part.get("type") == "image_url":
-                                print(f"    Part {j+1}: [Image included]")
-                            else:
-                                print(f"    Part {j+1}: {json.dumps(part, indent=4)}")
-                        else:
-                            print(f"    Part {j+1}: {part}")
-                elif content:
-                    print(f"    {json.dumps(content, indent=4)}")
-                else:
-                    print("    [No content]")
-            
-            # Get the last AI message specifically
-            print("\n" + "-" * 50)
-            print("🤖 AI Response:")
-            print("-" * 50)
-            ai_response_found = False
-            for msg in reversed(messages):
-                if msg.get("type") == "ai" or msg.get("role") == "assistant":
-                    ai_response_found = True
-                    content = msg.get("content", "")
-                    if isinstance(content, str) and content:
-                        print(content)
-                    elif isinstance(content, list):
-                        # Handle multi-part content
-                        for part in content:
-                            if isinstance(part, dict):
-                                if part.get("type") == "text":
-                                    text = part.get("text", "")
-                                    if text:
-                                        print(text)
-                                elif part.get("type") == "image_url":
-                                    print("[Image included in response]")
-                    break
+                                print("[Image included in response]")
+                break
+    
+        if not ai_response_found:
+            print("⚠️ No AI response found in messages")
+    else:
+        print("⚠️ No messages in state")
+        print(f"\nFull state (first 1000 chars):")
+        print(raw[:1000].decode("utf-8", "replace"))
+        if len(raw) > 1000:
+            print("... (truncated)")
+    
+    print("=" * 50)
+    print("✅ Test completed!")
+
+
+def _last_ai_text(messages: list) -> str:
+    """Get the text of the last AI message in a thread state."""
+    for msg in reversed(messages):
+        if msg.get("type") == "ai" or msg.get("role") == "assistant":
+            content = msg.get("content", "")
+            if isinstance(content, list):
+                content = "".join(
+                    part.get("text", "") for part in content
+                    if isinstance(part, dict) and part.get("type") == "text"
+                )
+            return content if isinstance(content, str) else dumps(content)
+    return ""
+
+
+async def _run_prompt(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, message: str) -> tuple[str, float, str]:
+    """Run one prompt on its own thread and wait for the final state."""
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            thread_response = await client.post("/threads", json={})
+            thread_response.raise_for_status()
+            thread_id = loads(thread_response.content)["thread_id"]
             
-            if not ai_response_found:
-                print("⚠️ No AI response found in messages")
-        else:
-            print("⚠️ No messages in state")
-            print(f"\nFull state (first 1000 chars):")
-            state_str = json.dumps(state_data, indent=2)
-            print(state_str[:1000])
-            if len(state_str) > 1000:
-                print("... (truncated)")
-        
-        print("=" * 50)
-        print("✅ Test completed!")
-        
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error getting response: {e}")
-        if hasattr(e.response, 'text'):
-            print(f"Response: {e.response.text}")
+            # runs/wait blocks server-side until the run finishes - no status polling
+            run_response = await client.post(
+                f"/threads/{thread_id}/runs/wait",
+                json={
+                    "assistant_id": GRAPH_ID,
+                    "input": {"messages": [{"role": "user", "content": message}]},
+                },
+            )
+            run_response.raise_for_status()
+            values = loads(run_response.content)
+            return message, time.perf_counter() - start, _last_ai_text(values.get("messages", []))
+        except httpx.ConnectError:
+            raise  # Server not running - test_langgraph_backend_batch reports it once
+        except (httpx.HTTPError, KeyError) as e:
+            return message, time.perf_counter() - start, f"❌ {e}"
+
+
+async def _run_prompts(messages: list[str], api_url: str, max_concurrency: int) -> list[tuple[str, float, str]]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with httpx.AsyncClient(base_url=api_url, timeout=300) as client:
+        return await asyncio.gather(*(_run_prompt(client, semaphore, message) for message in messages))
+
+
+def test_langgraph_backend_batch(
+    messages: Optional[list[str]] = None,
+    api_url: Optional[str] = None,
+    max_concurrency: int = 4,
+) -> None:
+    """
+    Smoke-test the LangGraph backend with several messages at once.
+    
+    Each message runs on its own thread; up to max_concurrency runs are in
+    flight at the same time.
+    
+    Args:
+        messages: The messages to send (default: ["hi"])
+        api_url: The LangGraph API URL (default: http://127.0.0.1:2024)
+        max_concurrency: Maximum number of concurrent runs (default: 4)
+    """
+    if not messages:
+        messages = ["hi"]
+    if api_url is None:
+        api_url = DEFAULT_URL
+    
+    print(f"🧪 Testing LangGraph backend at {api_url}")
+    print(f"📤 Sending {len(messages)} messages (max {max_concurrency} concurrent)")
+    print("-" * 50)
+    
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(_run_prompts(messages, api_url, max_concurrency))
+    except httpx.ConnectError:
+        print(f"❌ Connection error: Could not connect to {api_url}")
+        print("💡 Make sure the LangGraph server is running:")
+        print("   langgraph dev")
         sys.exit(1)
+    
+    for message, elapsed, reply in results:
+        print(f"\n📤 '{message}' ({elapsed:.1f}s)")
+        print(f"🤖 {reply[:500] if reply else '[No AI response]'}")
+    
+    print("\n" + "=" * 50)
+    print(f"✅ {len(results)} runs completed in {time.perf_counter() - start:.1f}s")
 
 
 if __name__ == "__main__":
-    # Get message from command line or use default
-    message = sys.argv[1] if len(sys.argv) > 1 else "hi"
+    # Get message(s) from command line or use default
+    # (--stateful: create thread/assistant/run separately instead of one /runs/wait)
+    stateful = "--stateful" in sys.argv[1:]
+    messages = [arg for arg in sys.argv[1:] if arg != "--stateful"] or ["hi"]
     
     # Get API URL from environment or use default
-    import os
     api_url = os.getenv("LANGGRAPH_API_URL", DEFAULT_URL)
     
-    test_langgraph_backend(message, api_url)
+    if len(messages) > 1:
+        test_langgraph_backend_batch(messages, api_url)
+    else:
+        test_langgraph_backend(messages[0], api_url, stateful=stateful)
 
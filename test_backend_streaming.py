@@ -1,21 +1,131 @@
 #!/usr/bin/env python3
 """Test script with streaming support using LangGraph Python SDK."""
 
+import asyncio
 import sys
 import os
-from typing import Optional
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Optional
 
 try:
-    from langgraph_sdk import get_sync_client
+    from langgraph_sdk import get_client
 except ImportError:
     print("❌ langgraph-sdk not installed. Installing...")
     os.system("pip install langgraph-sdk")
-    from langgraph_sdk import get_sync_client
+    from langgraph_sdk import get_client
+
+from backend_test_utils import ASSISTANT_CACHE_DIR, dumps, get_or_create_assistant
 
 # Default LangGraph dev server URL
 DEFAULT_URL = "http://127.0.0.1:2024"
 GRAPH_ID = "agent"
 
+# Assistant IDs created on earlier runs, per server URL (JSON: {api_url: assistant_id})
+ASSISTANT_CACHE_PATH = os.path.join(ASSISTANT_CACHE_DIR, "assistant_id")
+
+
+@dataclass(slots=True)
+class _StreamState:
+    """What the event handlers track while a run is streaming."""
+    chunks: list[str] = field(default_factory=list)  # Streamed text pieces, joined once at the end
+    thinking_shown: bool = False
+
+
+def _on_chat_model_start(state: _StreamState, event: dict) -> None:
+    if not state.thinking_shown:
+        print("💭 Thinking...")
+        state.thinking_shown = True
+
+
+def _on_chat_model_stream(state: _StreamState, event: dict) -> None:
+    """Print streaming text chunks."""
+    # Almost every chunk is a plain dict with "content" - try that first
+    try:
+        chunk_data = event["data"]["chunk"]
+        content = chunk_data["content"] or chunk_data["kwargs"]["content"]
+    except (KeyError, TypeError):
+        chunk_data = (event.get("data") or {}).get("chunk")
+        if isinstance(chunk_data, dict):
+            kwargs = chunk_data.get("kwargs")
+            content = chunk_data.get("content")
+        else:
+            kwargs = getattr(chunk_data, "kwargs", None)
+            content = getattr(chunk_data, "content", "")
+        # Serialized messages (Gemini format) keep the content in kwargs
+        content = content or (kwargs.get("content", "") if isinstance(kwargs, dict) else "")
+    if not content:
+        return
+    
+    if isinstance(content, list):
+        content = "".join(
+            part.get("text", "") for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    
+    if isinstance(content, str) and content:
+        # Write only the new text - reprinting the whole answer per token is O(n²)
+        if not state.chunks:
+            sys.stdout.write("🤖 ")
+        sys.stdout.write(content)
+        sys.stdout.flush()
+        state.chunks.append(content)
+
+
+def _tool_name(event: dict) -> str:
+    nested_data = event.get('data', {})
+    # Try multiple ways to get tool name
+    return (nested_data.get('name', '') if isinstance(nested_data, dict) else '') or \
+           event.get('name', '') or \
+           'unknown_tool'
+
+
+def _on_tool_start(state: _StreamState, event: dict) -> None:
+    nested_data = event.get('data', {})
+    tool_name = _tool_name(event)
+    tool_input = nested_data.get('input', {}) if isinstance(nested_data, dict) else {}
+    print(f"\n🔧 Using tool: {tool_name}")
+    if tool_input:
+        args_str = dumps(tool_input, indent=True) if isinstance(tool_input, dict) else str(tool_input)
+        if len(args_str) > 200:
+            args_str = args_str[:200] + "..."
+        print(f"   Args: {args_str}")
+
+
+def _on_tool_end(state: _StreamState, event: dict) -> None:
+    nested_data = event.get('data', {})
+    tool_name = _tool_name(event)
+    tool_output = nested_data.get('output', {}) if isinstance(nested_data, dict) else {}
+    
+    # Check for code in output
+    if isinstance(tool_output, dict):
+        if tool_output.get("code"):
+            print(f"\n✅ Code generated by {tool_name}")
+        elif tool_output.get("filename"):
+            print(f"\n✅ Image generated: {tool_output.get('filename')}")
+        else:
+            success = tool_output.get("success", False)
+            if success:
+                notes = tool_output.get("ai_notes", "")
+                if notes:
+                    print(f"\n✅ {tool_name}: {notes}")
+                else:
+                    print(f"\n✅ {tool_name} completed")
+            else:
+                error = tool_output.get("error", "Unknown error")
+                print(f"\n❌ {tool_name} error: {error}")
+    else:
+        print(f"\n✅ {tool_name} completed")
+
+
+# Streamed event type -> handler (other event types are ignored)
+HANDLERS: dict[str, Callable[[_StreamState, dict], None]] = {
+    "on_chat_model_start": _on_chat_model_start,
+    "on_chat_model_stream": _on_chat_model_stream,
+    "on_tool_start": _on_tool_start,
+    "on_tool_end": _on_tool_end,
+}
+
 
 def test_langgraph_backend_streaming(message: str = "hi", api_url: Optional[str] = None) -> None:
     """
@@ -28,17 +138,30 @@ def test_langgraph_backend_streaming(message: str = "hi", api_url: Optional[str]
     if api_url is None:
         api_url = DEFAULT_URL
     
+    asyncio.run(_stream_message(message, api_url))
+
+
+async def _stream_message(message: str, api_url: str) -> None:
+    """Create a thread and an assistant concurrently, then stream one run."""
     print(f"🧪 Testing LangGraph backend (STREAMING) at {api_url}")
     print(f"📤 Sending message: '{message}'")
     print("-" * 50)
     
     # Initialize client
-    client = get_sync_client(url=api_url)
+    client = get_client(url=api_url)
     
-    # Create a thread
+    # Thread and assistant don't depend on each other - create both at once
+    print("1️⃣ Creating thread and 2️⃣ creating/getting assistant...")
+    thread, assistant_result = await asyncio.gather(
+        client.threads.create(),
+        get_or_create_assistant(client, ASSISTANT_CACHE_PATH, api_url, GRAPH_ID, "Test Assistant"),
+        return_exceptions=True,
+    )
+    
+    # Check the thread
     try:
-        print("1️⃣ Creating thread...")
-        thread = client.threads.create()
+        if isinstance(thread, Exception):
+            raise thread
         # Handle both dict and object responses
         thread_id = thread.get("thread_id") if isinstance(thread, dict) else getattr(thread, "thread_id", None)
         if not thread_id:
@@ -50,27 +173,23 @@ def test_langgraph_backend_streaming(message: str = "hi", api_url: Optional[str]
         print(f"❌ Error creating thread: {e}")
         print("💡 Make sure the LangGraph server is running:")
         print("   langgraph dev")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
     
-    # Create an assistant (or use existing)
+    # Check the assistant
     try:
-        print("\n2️⃣ Creating/getting assistant...")
-        assistant = client.assistants.create(
-            graph_id=GRAPH_ID,
-            name="Test Assistant"
-        )
+        if isinstance(assistant_result, Exception):
+            raise assistant_result
+        assistant, reused = assistant_result
         # Handle both dict and object responses
         assistant_id = assistant.get("assistant_id") if isinstance(assistant, dict) else getattr(assistant, "assistant_id", None)
         if not assistant_id:
             print(f"❌ Unexpected assistant response format: {assistant}")
             sys.exit(1)
-        print(f"✅ Assistant created: {assistant_id}")
+        print(f"✅ {'Reusing assistant' if reused else 'Assistant created'}: {assistant_id}")
         
     except Exception as e:
         print(f"❌ Error creating assistant: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
     
@@ -92,163 +211,34 @@ def test_langgraph_backend_streaming(message: str = "hi", api_url: Optional[str]
                     }
                 ]
             },
-            stream_mode=["events", "messages", "values"]
+            # "events" alone covers model tokens and tool start/end - "messages" and
+            # "values" would only resend the same text
+            stream_mode="events"
         )
         
         # Process streaming events
-        current_text = ""
-        last_printed_text = ""
-        thinking_shown = False
-        active_tools = set()
-        event_count = 0
+        state = _StreamState()
+        errors = 0
         
-        for event in stream:
-            event_count += 1
+        async for event in stream:
+            event_type = None
             try:
-                # StreamPart has 'event' and 'data' attributes
-                event_type = getattr(event, 'event', None)
+                # StreamPart has 'event' and 'data' attributes; events mode wraps
+                # each event as {"event": "on_...", "name": ..., "data": {...}}
                 event_data = getattr(event, 'data', {})
-                
-                if not event_type:
+                if getattr(event, 'event', None) != "events" or not isinstance(event_data, dict):
                     continue
                 
-                # Handle nested events structure (events mode wraps events in 'data')
-                if event_type == "events" and isinstance(event_data, dict):
-                    # This is a wrapper event, extract the actual event
-                    nested_event = event_data.get('event', '')
-                    nested_data = event_data.get('data', {})
-                    if nested_event:
-                        event_type = nested_event
-                        event_data = nested_data
-                
-                # Handle different event types
-                if event_type == "on_chat_model_start":
-                    if not thinking_shown:
-                        print("💭 Thinking...")
-                        thinking_shown = True
-                
-                elif event_type == "on_chat_model_stream":
-                    # Streaming text chunks
-                    chunk_data = event_data.get('chunk', {}) if isinstance(event_data, dict) else {}
-                    
-                    # Extract content from chunk
-                    content = None
-                    if isinstance(chunk_data, dict):
-                        content = chunk_data.get('content', '')
-                        # Also check kwargs for Gemini format
-                        if not content and 'kwargs' in chunk_data:
-                            kwargs = chunk_data.get('kwargs', {})
-                            content = kwargs.get('content', '') if isinstance(kwargs, dict) else ''
-                    elif hasattr(chunk_data, 'content'):
-                        content = chunk_data.content
-                    elif hasattr(chunk_data, 'kwargs'):
-                        kwargs = chunk_data.kwargs
-                        content = kwargs.get('content', '') if isinstance(kwargs, dict) else ''
-                    
-                    if isinstance(content, str) and content:
-                        current_text += content
-                        if current_text != last_printed_text:
-                            print(f"\r🤖 {current_text}", end="", flush=True)
-                            last_printed_text = current_text
-                    elif isinstance(content, list):
-                        for part in content:
-                            if isinstance(part, dict) and part.get("type") == "text":
-                                text = part.get("text", "")
-                                if text:
-                                    current_text += text
-                                    if current_text != last_printed_text:
-                                        print(f"\r🤖 {current_text}", end="", flush=True)
-                                        last_printed_text = current_text
-                
-                elif event_type == "on_tool_start":
-                    # event_data contains nested event data
-                    nested_data = event_data.get('data', {}) if isinstance(event_data, dict) else event_data
-                    # Try multiple ways to get tool name
-                    tool_name = (nested_data.get('name', '') if isinstance(nested_data, dict) else '') or \
-                               (event_data.get('name', '') if isinstance(event_data, dict) else '') or \
-                               'unknown_tool'
-                    tool_input = nested_data.get('input', {}) if isinstance(nested_data, dict) else {}
-                    active_tools.add(tool_name)
-                    print(f"\n🔧 Using tool: {tool_name}")
-                    if tool_input:
-                        import json
-                        args_str = json.dumps(tool_input, indent=2) if isinstance(tool_input, dict) else str(tool_input)
-                        if len(args_str) > 200:
-                            args_str = args_str[:200] + "..."
-                        print(f"   Args: {args_str}")
-                
-                elif event_type == "on_tool_end":
-                    # event_data contains nested event data
-                    nested_data = event_data.get('data', {}) if isinstance(event_data, dict) else event_data
-                    # Try multiple ways to get tool name
-                    tool_name = (nested_data.get('name', '') if isinstance(nested_data, dict) else '') or \
-                               (event_data.get('name', '') if isinstance(event_data, dict) else '') or \
-                               'unknown_tool'
-                    tool_output = nested_data.get('output', {}) if isinstance(nested_data, dict) else {}
-                    active_tools.discard(tool_name)
-                    
-                    # Check for code in output
-                    if isinstance(tool_output, dict):
-                        if tool_output.get("code"):
-                            print(f"\n✅ Code generated by {tool_name}")
-                        elif tool_output.get("filename"):
-                            print(f"\n✅ Image generated: {tool_output.get('filename')}")
-                        else:
-                            success = tool_output.get("success", False)
-                            if success:
-                                notes = tool_output.get("ai_notes", "")
-                                if notes:
-                                    print(f"\n✅ {tool_name}: {notes}")
-                                else:
-                                    print(f"\n✅ {tool_name} completed")
-                            else:
-                                error = tool_output.get("error", "Unknown error")
-                                print(f"\n❌ {tool_name} error: {error}")
-                    else:
-                        print(f"\n✅ {tool_name} completed")
-                
-                elif event_type == "messages":
-                    # Message update
-                    messages = event_data.get('messages', []) if isinstance(event_data, dict) else []
-                    if isinstance(messages, list):
-                        for msg in messages:
-                            if isinstance(msg, (list, tuple)) and len(msg) >= 2:
-                                msg_type, msg_data = msg[0], msg[1]
-                                if msg_type in ["ai", "AIMessageChunk"] and isinstance(msg_data, dict):
-                                    content = msg_data.get("content", "")
-                                    if isinstance(content, str) and content and content != current_text:
-                                        current_text = content
-                                        print(f"\r🤖 {current_text}", end="", flush=True)
-                                        last_printed_text = current_text
-                            elif isinstance(msg, dict):
-                                if msg.get("type") == "ai" or msg.get("role") == "assistant":
-                                    content = msg.get("content", "")
-                                    if isinstance(content, str) and content and content != current_text:
-                                        current_text = content
-                                        print(f"\r🤖 {current_text}", end="", flush=True)
-                                        last_printed_text = current_text
-                
-                elif event_type == "values":
-                    # State update
-                    messages = event_data.get("messages", []) if isinstance(event_data, dict) else []
-                    for msg in reversed(messages):
-                        if isinstance(msg, dict) and (msg.get("type") == "ai" or msg.get("role") == "assistant"):
-                            content = msg.get("content", "")
-                            if isinstance(content, str) and content and content != current_text:
-                                current_text = content
-                                print(f"\r🤖 {current_text}", end="", flush=True)
-                                last_printed_text = current_text
-                            break
-                
-                # Also handle 'events' wrapper type
-                elif event_type == "events":
-                    # Already handled above in the nested event extraction
-                    pass
+                event_type = event_data.get('event')
+                handler = HANDLERS.get(event_type)
+                if handler:
+                    handler(state, event_data)
                 
             except Exception as e:
                 # Show errors for debugging (only first few)
-                if event_count <= 10:
-                    print(f"\n⚠️ Error processing event {event_count} ({event_type}): {e}")
+                errors += 1
+                if errors <= 10:
+                    print(f"\n⚠️ Error processing event ({event_type}): {e}")
                 continue
         
         # Final newline
@@ -256,12 +246,11 @@ def test_langgraph_backend_streaming(message: str = "hi", api_url: Optional[str]
         print("=" * 50)
         print("✅ Streaming completed!")
         
-        if current_text:
-            print(f"\n📝 Final response: {current_text}")
+        if state.chunks:
+            print(f"\n📝 Final response: {''.join(state.chunks)}")
         
     except Exception as e:
         print(f"\n❌ Error during streaming: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
@@ -1,39 +1,76 @@
 #!/usr/bin/env python3
 """Performance test: 3 turns - generate login screen, convert to code, modify button color."""
 
+import asyncio
 import sys
 import os
 import time
 import re
-import base64
-from typing import Optional, Tuple
+import binascii
+import io
+import mmap
+import operator
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Tuple
 
 try:
-    from langgraph_sdk import get_sync_client
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    from langgraph_sdk import get_client
 except ImportError:
     print("❌ langgraph-sdk not installed. Installing...")
     os.system("pip install langgraph-sdk")
-    from langgraph_sdk import get_sync_client
+    from langgraph_sdk import get_client
+
+from backend_test_utils import ASSISTANT_CACHE_DIR, get_or_create_assistant, loads
 
 # Default LangGraph dev server URL
 DEFAULT_URL = "http://127.0.0.1:2024"
 GRAPH_ID = "agent"
 
+# Assistant IDs created on earlier runs, per server URL and graph (JSON: {"api_url|graph_id": assistant_id})
+ASSISTANT_CACHE_PATH = os.path.join(ASSISTANT_CACHE_DIR, "perf_assistant_id")
 
-def extract_image_filename(response_text: str) -> Optional[str]:
-    """Extract image filename from response text."""
-    # Look for patterns like /outputs/design_xxx.png or design_xxx.png
-    patterns = [
+# Minimum seconds between streamed preview redraws (~20 per second)
+PREVIEW_INTERVAL = 0.05
+
+# PNGs larger than this are sent as JPEG (smaller upload, fewer image tokens) when Pillow is installed
+JPEG_REENCODE_MIN_BYTES = 200 * 1024
+JPEG_QUALITY = 85
+
+# Image filename patterns, most specific first: (compiled pattern, has a capture group)
+# Look for patterns like /outputs/design_xxx.png or design_xxx.png
+_IMAGE_PATTERNS = tuple(
+    (pattern, pattern.groups > 0)
+    for pattern in map(re.compile, [
         r'/outputs/(design_[a-f0-9]+_\d{8}_\d{6}\.png)',
         r'outputs/(design_[a-f0-9]+_\d{8}_\d{6}\.png)',
         r'design_([a-f0-9]+_\d{8}_\d{6}\.png)',
         r'design_([a-f0-9]+_\d{8}_\d{6})',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, response_text)
+    ])
+)
+
+# Run input reused by every turn; only the user message content changes
+_USER_MESSAGE = {"role": "user", "content": None}
+_RUN_INPUT = {"messages": [_USER_MESSAGE]}
+
+# Base64 of images already read, keyed by (path, mtime_ns, size) so an
+# unchanged file is only encoded once per process
+_image_base64_cache: dict[tuple[str, int, int], str] = {}
+
+# First fenced code block in a response
+_CODE_FENCE_RE = re.compile(r'```(?:tsx|ts|jsx|js)?\n(.*?)```', re.DOTALL)
+
+
+def extract_image_filename(response_text: str) -> Optional[str]:
+    """Extract image filename from response text."""
+    for pattern, has_group in _IMAGE_PATTERNS:
+        match = pattern.search(response_text)
         if match:
-            filename = match.group(1) if '(' in pattern else match.group(0)
+            filename = match.group(1) if has_group else match.group(0)
             # Ensure .png extension
             if not filename.endswith('.png'):
                 filename += '.png'
@@ -45,41 +82,188 @@ def extract_image_filename(response_text: str) -> Optional[str]:
 def get_latest_image_from_outputs() -> Optional[str]:
     """Get the most recently created image from outputs folder."""
     outputs_dir = "outputs"
-    if not os.path.exists(outputs_dir):
+    if not os.path.isdir(outputs_dir):
         return None
     
-    # Get all PNG files
-    image_files = [
-        f for f in os.listdir(outputs_dir)
-        if f.startswith("design_") and f.endswith(".png")
-    ]
-    
-    if not image_files:
+    # Single pass over the directory, keeping the newest design PNG
+    latest_file = None
+    latest_mtime = -1.0
+    with os.scandir(outputs_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith("design_") and name.endswith(".png"):
+                mtime = entry.stat().st_mtime
+                if mtime > latest_mtime:
+                    latest_mtime, latest_file = mtime, name
+    
+    return latest_file
+
+
+def _reencode_as_jpeg(image_file, original_size: int) -> Optional[bytes]:
+    """Re-encode an open PNG as JPEG; None if it has transparency, fails or doesn't get smaller."""
+    try:
+        with Image.open(image_file) as im:
+            if im.mode in ("RGBA", "LA") or "transparency" in im.info:
+                return None  # Keep transparency - JPEG would flatten it onto black
+            buffer = io.BytesIO()
+            im.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    except Exception as e:
+        print(f"⚠️ Could not re-encode image as JPEG, sending PNG: {e}")
         return None
-    
-    # Sort by modification time (newest first)
-    image_files.sort(
-        key=lambda f: os.path.getmtime(os.path.join(outputs_dir, f)),
-        reverse=True
-    )
-    
-    return image_files[0]
+    jpeg_bytes = buffer.getvalue()
+    return jpeg_bytes if len(jpeg_bytes) < original_size else None
+
+
+def _image_mime_type(image_base64: str) -> str:
+    """MIME type of a base64 image from read_image_as_base64 (JPEG data always starts with "/9j/")."""
+    return "image/jpeg" if image_base64.startswith("/9j/") else "image/png"
 
 
 def read_image_as_base64(image_path: str) -> Optional[str]:
-    """Read image file and return as base64 string."""
+    """Read image file and return as base64 string (None if it doesn't exist or can't be read)."""
     try:
-        if not os.path.exists(image_path):
-            return None
         with open(image_path, 'rb') as f:
-            image_bytes = f.read()
-            return base64.b64encode(image_bytes).decode('utf-8')
+            st = os.fstat(f.fileno())
+            cache_key = (image_path, st.st_mtime_ns, st.st_size)
+            cached = _image_base64_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            jpeg_bytes = None
+            if Image is not None and st.st_size > JPEG_REENCODE_MIN_BYTES and image_path.endswith('.png'):
+                jpeg_bytes = _reencode_as_jpeg(f, st.st_size)
+            if jpeg_bytes is not None:
+                image_base64 = binascii.b2a_base64(jpeg_bytes, newline=False).decode('ascii')
+            elif st.st_size == 0:
+                image_base64 = ""
+            else:
+                # Encode straight from the mapped file instead of copying it with f.read()
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image_map:
+                    image_base64 = binascii.b2a_base64(image_map, newline=False).decode('ascii')
+        _image_base64_cache[cache_key] = image_base64
+        return image_base64
+    except FileNotFoundError:
+        return None
     except Exception as e:
         print(f"⚠️ Error reading image: {e}")
         return None
 
 
-def send_message_and_get_response(client, thread_id: str, assistant_id: str, message: str, image_base64: Optional[str] = None) -> Tuple[str, float, dict]:
+@dataclass(slots=True)
+class _TurnState:
+    """What the event handlers track while one turn is streaming."""
+    # Streamed text is only joined at the end if no "values" snapshot supplied the
+    # final text; only the first 100 chars are shown, so the preview stops changing after that.
+    chunks: list[str] = field(default_factory=list)
+    final_text: str = ""
+    preview: str = ""
+    next_preview_at: float = 0.0
+    tools_used: dict[str, None] = field(default_factory=dict)  # Insertion-ordered set of tool names
+    tool_starts: dict[str, float] = field(default_factory=dict)  # perf_counter() at tool start
+    tool_times: dict[str, float] = field(default_factory=dict)  # Elapsed seconds per finished tool
+    tool_outputs: dict = field(default_factory=dict)  # Store tool outputs to extract code
+
+
+def _tool_name(event: dict) -> str:
+    nested_data = event.get('data', {})
+    # Try multiple ways to get tool name
+    return (nested_data.get('name', '') if isinstance(nested_data, dict) else '') or \
+           event.get('name', '') or \
+           'unknown_tool'
+
+
+def _on_tool_start(state: _TurnState, event: dict) -> None:
+    tool_name = _tool_name(event)
+    if tool_name not in state.tools_used:
+        state.tools_used[tool_name] = None
+        state.tool_starts[tool_name] = time.perf_counter()
+        print(f"\n   🔧 Tool started: {tool_name}")
+
+
+def _on_tool_end(state: _TurnState, event: dict) -> None:
+    nested_data = event.get('data', {})
+    tool_name = _tool_name(event)
+    started = state.tool_starts.pop(tool_name, None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        state.tool_times[tool_name] = elapsed
+        print(f"   ✅ Tool finished: {tool_name} ({elapsed:.2f}s)")
+    
+    # Store tool output to extract code later
+    tool_output = nested_data.get('output', {}) if isinstance(nested_data, dict) else {}
+    if isinstance(tool_output, dict):
+        if tool_output.get('code'):
+            state.tool_outputs[tool_name] = tool_output
+            print(f"   📝 Code found in {tool_name} output ({len(tool_output.get('code', ''))} chars)")
+    # Also check if output is a string that might contain JSON with code -
+    # only strings that start like a JSON object are worth parsing
+    elif isinstance(tool_output, str) and tool_output.lstrip()[:1] == '{':
+        try:
+            parsed = loads(tool_output)
+        except ValueError:
+            return
+        if isinstance(parsed, dict) and parsed.get('code'):
+            state.tool_outputs[tool_name] = parsed
+            print(f"   📝 Code found in {tool_name} output (JSON string)")
+
+
+def _on_chat_model_stream(state: _TurnState, event: dict) -> None:
+    """Collect streamed text and redraw the preview line."""
+    nested_data = event.get('data', {})
+    chunk_data = nested_data.get('chunk', {}) if isinstance(nested_data, dict) else {}
+    content = None
+    if isinstance(chunk_data, dict):
+        content = chunk_data.get('content', '')
+        if not content and 'kwargs' in chunk_data:
+            kwargs = chunk_data.get('kwargs', {})
+            content = kwargs.get('content', '') if isinstance(kwargs, dict) else ''
+    
+    if isinstance(content, str) and content:
+        state.chunks.append(content)
+        if len(state.preview) < 100:
+            preview = state.preview = (state.preview + content)[:100]
+            now = time.monotonic()
+            # Always draw the completed preview, even inside the interval
+            if now >= state.next_preview_at or len(preview) >= 100:
+                sys.stdout.write(f"\r🤖 {preview}...")
+                sys.stdout.flush()
+                state.next_preview_at = now + PREVIEW_INTERVAL
+
+
+def _on_values(state: _TurnState, values: dict) -> None:
+    """Take this turn's latest AI message from a full state snapshot.
+    
+    Only messages after the last human message count - the first snapshot of a
+    turn arrives before the new reply exists and still ends with the previous answer.
+    """
+    messages = values.get("messages", [])
+    for msg in reversed(messages):
+        if not isinstance(msg, dict):
+            continue
+        if msg.get("type") == "human" or msg.get("role") == "user":
+            break  # No reply to this turn in the snapshot yet - keep the streamed chunks
+        if msg.get("type") == "ai" or msg.get("role") == "assistant":
+            content = msg.get("content", "")
+            if isinstance(content, str) and content:
+                state.final_text = content
+                if content[:100] != state.preview:
+                    state.preview = content[:100]
+                    print(f"\r🤖 {state.preview}...", end="", flush=True)
+            break
+
+
+# (event, data) of a streamed StreamPart in one call
+_event_fields = operator.attrgetter('event', 'data')
+
+# Streamed event type -> handler (other event types are ignored)
+HANDLERS: dict[str, Callable[[_TurnState, dict], None]] = {
+    "on_tool_start": _on_tool_start,
+    "on_tool_end": _on_tool_end,
+    "on_chat_model_stream": _on_chat_model_stream,
+    "values": _on_values,
+}
+
+
+async def send_message_and_get_response(client, thread_id: str, assistant_id: str, message: str, image_base64: Optional[str] = None) -> Tuple[str, float, dict]:
     """
     Send a message and get the full response with timing.
     Returns: (response_text, elapsed_time, stats_dict)
@@ -89,7 +273,7 @@ def send_message_and_get_response(client, thread_id: str, assistant_id: str, mes
         image_size_kb = len(image_base64) * 3 / 4 / 1024  # Approximate size
         print(f"   📸 With image (~{image_size_kb:.1f} KB base64)")
     
-    start_time = time.time()
+    request_start = time.perf_counter()
     
     # Prepare message content - IMPORTANT: Images must be sent as image_url type, not text!
     if image_base64:
@@ -99,132 +283,56 @@ def send_message_and_get_response(client, thread_id: str, assistant_id: str, mes
             {
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/png;base64,{image_base64}"
+                    "url": f"data:{_image_mime_type(image_base64)};base64,{image_base64}"
                 }
             }
         ]
     else:
         message_content = message
     
-    # Stream the run
+    # Stream the run - turns run one after another, so the shared input can be
+    # reused; the SDK serializes it with orjson (in a worker thread) when the
+    # request is sent, so the base64 image needs no special handling here
+    _USER_MESSAGE["content"] = message_content
     stream = client.runs.stream(
         thread_id=thread_id,
         assistant_id=assistant_id,
-        input={
-            "messages": [
-                {
-                    "role": "user",
-                    "content": message_content
-                }
-            ]
-        },
+        input=_RUN_INPUT,
         stream_mode=["events", "messages", "values"]
     )
     
     # Process streaming events
-    current_text = ""
-    last_printed_text = ""
-    tools_used = []
-    tool_times = {}
-    tool_outputs = {}  # Store tool outputs to extract code
+    state = _TurnState()
     
-    for event in stream:
+    async for event in stream:
         try:
-            event_type = getattr(event, 'event', None)
-            event_data = getattr(event, 'data', {})
+            # Parts without these fields raise AttributeError and are skipped below
+            event_type, event_data = _event_fields(event)
             
-            if not event_type:
+            if not event_type or not isinstance(event_data, dict):
                 continue
             
-            # Handle nested events structure
-            if event_type == "events" and isinstance(event_data, dict):
-                nested_event = event_data.get('event', '')
-                nested_data = event_data.get('data', {})
-                if nested_event:
-                    event_type = nested_event
-                    event_data = nested_data
-            
-            # Track tool usage
-            if event_type == "on_tool_start":
-                nested_data = event_data.get('data', {}) if isinstance(event_data, dict) else event_data
-                # Try multiple ways to get tool name
-                tool_name = (nested_data.get('name', '') if isinstance(nested_data, dict) else '') or \
-                           (event_data.get('name', '') if isinstance(event_data, dict) else '') or \
-                           'unknown_tool'
-                if tool_name not in tools_used:
-                    tools_used.append(tool_name)
-                    tool_times[tool_name] = time.time()
-                    print(f"\n   🔧 Tool started: {tool_name}")
-            
-            elif event_type == "on_tool_end":
-                nested_data = event_data.get('data', {}) if isinstance(event_data, dict) else event_data
-                # Try multiple ways to get tool name
-                tool_name = (nested_data.get('name', '') if isinstance(nested_data, dict) else '') or \
-                           (event_data.get('name', '') if isinstance(event_data, dict) else '') or \
-                           'unknown_tool'
-                if tool_name in tool_times:
-                    start_time = tool_times[tool_name]
-                    if isinstance(start_time, float) and start_time > 1000000000:  # It's a timestamp
-                        elapsed = time.time() - start_time
-                    else:
-                        elapsed = start_time  # Already elapsed time
-                    tool_times[tool_name] = elapsed
-                    print(f"   ✅ Tool finished: {tool_name} ({elapsed:.2f}s)")
-                
-                # Store tool output to extract code later
-                tool_output = nested_data.get('output', {}) if isinstance(nested_data, dict) else {}
-                if isinstance(tool_output, dict):
-                    if tool_output.get('code'):
-                        tool_outputs[tool_name] = tool_output
-                        print(f"   📝 Code found in {tool_name} output ({len(tool_output.get('code', ''))} chars)")
-                    # Also check if output is a string that might contain JSON with code
-                    elif isinstance(tool_output, str):
-                        try:
-                            parsed = json.loads(tool_output)
-                            if isinstance(parsed, dict) and parsed.get('code'):
-                                tool_outputs[tool_name] = parsed
-                                print(f"   📝 Code found in {tool_name} output (JSON string)")
-                        except:
-                            pass
-            
-            # Handle streaming text
-            if event_type == "on_chat_model_stream":
-                chunk_data = event_data.get('chunk', {}) if isinstance(event_data, dict) else {}
-                content = None
-                if isinstance(chunk_data, dict):
-                    content = chunk_data.get('content', '')
-                    if not content and 'kwargs' in chunk_data:
-                        kwargs = chunk_data.get('kwargs', {})
-                        content = kwargs.get('content', '') if isinstance(kwargs, dict) else ''
-                
-                if isinstance(content, str) and content:
-                    current_text += content
-                    if current_text != last_printed_text:
-                        print(f"\r🤖 {current_text[:100]}...", end="", flush=True)
-                        last_printed_text = current_text
+            # Events mode wraps each event as {"event": "on_...", "name": ..., "data": {...}};
+            # handlers get the whole wrapper so the tool name stays available
+            if event_type == "events":
+                event_type = event_data.get('event', '')
             
-            elif event_type == "values":
-                messages = event_data.get("messages", []) if isinstance(event_data, dict) else []
-                for msg in reversed(messages):
-                    if isinstance(msg, dict) and (msg.get("type") == "ai" or msg.get("role") == "assistant"):
-                        content = msg.get("content", "")
-                        if isinstance(content, str) and content and content != current_text:
-                            current_text = content
-                            print(f"\r🤖 {current_text[:100]}...", end="", flush=True)
-                            last_printed_text = current_text
-                        break
+            handler = HANDLERS.get(event_type)
+            if handler:
+                handler(state, event_data)
         
         except Exception:
             continue
     
-    elapsed_time = time.time() - start_time
+    elapsed_time = time.perf_counter() - request_start
     print(f"\r{' ' * 120}\r", end="")  # Clear line
+    current_text = state.final_text or "".join(state.chunks)
     
     stats = {
-        "tools_used": tools_used,
-        "tool_times": tool_times,
+        "tools_used": list(state.tools_used),
+        "tool_times": state.tool_times,
         "response_length": len(current_text),
-        "tool_outputs": tool_outputs
+        "tool_outputs": state.tool_outputs
     }
     
     return current_text, elapsed_time, stats
@@ -233,7 +341,11 @@ def send_message_and_get_response(client, thread_id: str, assistant_id: str, mes
 def test_performance():
     """Run 3-turn performance test."""
     api_url = os.getenv("LANGGRAPH_API_URL", DEFAULT_URL)
-    
+    asyncio.run(_run_performance_test(api_url))
+
+
+async def _run_performance_test(api_url: str) -> None:
+    """Run the 3 turns against api_url with the async client."""
     print("=" * 70)
     print("🚀 PERFORMANCE TEST: 3 Turns")
     print("=" * 70)
@@ -242,22 +354,24 @@ def test_performance():
     print("Turn 3: Modify button color (should be fast - 1 line change)")
     print("=" * 70)
     
-    # Initialize client
-    client = get_sync_client(url=api_url)
+    # Initialize client - one client for all turns; the SDK wraps a single
+    # httpx.AsyncClient, so setup calls and streams reuse its keep-alive connections
+    client = get_client(url=api_url)
     
-    # Create thread and assistant
+    # Create thread and assistant - they don't depend on each other
     print("\n📋 Setting up...")
-    thread = client.threads.create()
+    thread, (assistant, reused) = await asyncio.gather(
+        client.threads.create(),
+        get_or_create_assistant(
+            client, ASSISTANT_CACHE_PATH, f"{api_url}|{GRAPH_ID}", GRAPH_ID, "Performance Test Assistant"
+        ),
+    )
     thread_id = thread.get("thread_id") if isinstance(thread, dict) else thread.thread_id
     
-    assistant = client.assistants.create(
-        graph_id=GRAPH_ID,
-        name="Performance Test Assistant"
-    )
     assistant_id = assistant.get("assistant_id") if isinstance(assistant, dict) else assistant.assistant_id
     
     print(f"✅ Thread: {thread_id[:8]}...")
-    print(f"✅ Assistant: {assistant_id[:8]}...")
+    print(f"✅ {'Reusing assistant' if reused else 'Assistant'}: {assistant_id[:8]}...")
     
     results = []
     
@@ -267,7 +381,7 @@ def test_performance():
     print("=" * 70)
     
     turn1_message = "Erstelle ein modernes Login-Formular mit Email und Passwort Feldern"
-    response1, time1, stats1 = send_message_and_get_response(client, thread_id, assistant_id, turn1_message)
+    response1, time1, stats1 = await send_message_and_get_response(client, thread_id, assistant_id, turn1_message)
     
     print(f"✅ Turn 1 completed in {time1:.2f} seconds")
     if stats1["tools_used"]:
@@ -290,14 +404,14 @@ def test_performance():
     image_base64 = None
     if image_filename:
         image_path = os.path.join("outputs", image_filename)
-        if os.path.exists(image_path):
+        # Read/encode off the event loop - opening the file is the existence check
+        image_base64 = await asyncio.to_thread(read_image_as_base64, image_path)
+        if image_base64:
             print(f"📸 Found image: {image_filename}")
-            image_base64 = read_image_as_base64(image_path)
-            if image_base64:
-                size_kb = len(image_base64) * 3 / 4 / 1024  # Approximate size
-                print(f"   Image size: ~{size_kb:.1f} KB (base64)")
-            else:
-                print(f"⚠️ Could not read image from {image_path}")
+            size_kb = len(image_base64) * 3 / 4 / 1024  # Approximate size
+            print(f"   Image size: ~{size_kb:.1f} KB (base64)")
+        elif os.path.exists(image_path):
+            print(f"⚠️ Could not read image from {image_path}")
         else:
             print(f"⚠️ Image file not found: {image_path}")
     else:
@@ -314,7 +428,7 @@ def test_performance():
     else:
         turn2_message = "Wandle das generierte Login-Formular Bild in React + Tailwind Code um"
     
-    response2, time2, stats2 = send_message_and_get_response(client, thread_id, assistant_id, turn2_message, image_base64)
+    response2, time2, stats2 = await send_message_and_get_response(client, thread_id, assistant_id, turn2_message, image_base64)
     
     print(f"✅ Turn 2 completed in {time2:.2f} seconds")
     if stats2["tools_used"]:
@@ -323,7 +437,8 @@ def test_performance():
             if isinstance(tool_time, float) and tool_time > 0:
                 print(f"   - {tool}: {tool_time:.2f}s")
     # Check if code was generated
-    if "code" in response2.lower() or "react" in response2.lower():
+    response2_lower = response2.lower()
+    if "code" in response2_lower or "react" in response2_lower:
         print(f"   📝 Code generation detected in response")
     results.append(("Turn 2: Convert to Code", time2))
     
@@ -344,8 +459,8 @@ def test_performance():
                 break
     
     # Fallback: Look for code blocks in response text
-    if not code_from_turn2:
-        code_match = re.search(r'```(?:tsx|ts|jsx|js)?\n(.*?)```', response2, re.DOTALL)
+    if not code_from_turn2 and "```" in response2:
+        code_match = _CODE_FENCE_RE.search(response2)
         if code_match:
             code_from_turn2 = code_match.group(1).strip()
             print(f"📝 Found code from Turn 2 response text ({len(code_from_turn2)} chars)")
@@ -366,7 +481,7 @@ Mache den Login-Button rot"""
     else:
         turn3_message = "Mache den Login-Button rot"
     
-    response3, time3, stats3 = send_message_and_get_response(client, thread_id, assistant_id, turn3_message)
+    response3, time3, stats3 = await send_message_and_get_response(client, thread_id, assistant_id, turn3_message)
     
     print(f"✅ Turn 3 completed in {time3:.2f} seconds")
     if stats3["tools_used"]:
@@ -375,7 +490,8 @@ Mache den Login-Button rot"""
             if isinstance(tool_time, float) and tool_time > 0:
                 print(f"   - {tool}: {tool_time:.2f}s")
     # Check if modification was done
-    if "rot" in response3.lower() or "red" in response3.lower() or "bg-red" in response3.lower():
+    response3_lower = response3.lower()
+    if "rot" in response3_lower or "red" in response3_lower or "bg-red" in response3_lower:
         print(f"   ✅ Color modification detected")
     results.append(("Turn 3: Modify Button Color", time3))
     